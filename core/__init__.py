@@ -3,5 +3,9 @@ Core extraction module for website content.
 """
 
 from .extractor import ContentExtractor
+from .jobs import JobManager, JobStore
+from .crawler import CrawlStore, FeedCrawler
+from .dedup import ContentStore
+from .profiler import profile_url
 
-__all__ = ["ContentExtractor"]
\ No newline at end of file
+__all__ = ["ContentExtractor", "JobManager", "JobStore", "CrawlStore", "FeedCrawler", "ContentStore", "profile_url"]
\ No newline at end of file
@@ -0,0 +1,379 @@
+"""
+Feed and sitemap crawling with incremental extraction.
+RSS/Atom feeds and XML sitemaps are parsed as they are downloaded, and only the
+entries that are new or changed since the previous crawl are extracted.
+"""
+
+import logging
+import sqlite3
+import threading
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from .extractor import ContentExtractor
+
+logger = logging.getLogger(__name__)
+
+
+def _local_name(tag):
+    """Strip the XML namespace from a tag name."""
+    return tag.rsplit('}', 1)[-1]
+
+
+def _child_text(element, name):
+    """Get the stripped text of the first child with the given local name."""
+    for child in element:
+        if _local_name(child.tag) == name and child.text:
+            return child.text.strip()
+    return None
+
+
+def _atom_link(entry):
+    """Get the URL of an Atom entry, preferring its alternate link."""
+    fallback = None
+    for child in entry:
+        if _local_name(child.tag) != 'link' or not child.get('href'):
+            continue
+        if child.get('rel', 'alternate') == 'alternate':
+            return child.get('href').strip()
+        fallback = fallback or child.get('href').strip()
+    return fallback
+
+
+def parse_feed(chunks):
+    """
+    Incrementally parse an RSS feed, Atom feed, sitemap or sitemap index.
+
+    Entries are detached from the document once processed so memory stays bounded
+    on large documents, as long as the caller consumes the entries as they come.
+
+    Args:
+        chunks (iterable): Byte chunks of the document
+
+    Yields:
+        tuple: (kind, url, stamp) where kind is "entry" for a page and "sitemap"
+            for a child sitemap of a sitemap index, and stamp is the last
+            modification marker of the entry (or None)
+    """
+    parser = ET.XMLPullParser(events=('start', 'end'))
+    # Elements currently open, so processed entries can be removed from their parent
+    open_elements = []
+    for chunk in chunks:
+        parser.feed(chunk)
+        for event, element in parser.read_events():
+            if event == 'start':
+                open_elements.append(element)
+                continue
+            open_elements.pop()
+            name = _local_name(element.tag)
+            if name == 'item':
+                # RSS
+                url = _child_text(element, 'link') or _child_text(element, 'guid')
+                stamp = _child_text(element, 'pubDate') or _child_text(element, 'date')
+                kind = 'entry'
+            elif name == 'entry':
+                # Atom
+                url = _atom_link(element)
+                stamp = _child_text(element, 'updated') or _child_text(element, 'published')
+                kind = 'entry'
+            elif name in ('url', 'sitemap'):
+                # Sitemap and sitemap index
+                url = _child_text(element, 'loc')
+                stamp = _child_text(element, 'lastmod')
+                kind = 'entry' if name == 'url' else 'sitemap'
+            else:
+                continue
+            if open_elements:
+                open_elements[-1].remove(element)
+            if url:
+                yield kind, url, stamp
+    parser.close()
+
+
+class CrawlStore:
+    """SQLite-backed memory of crawled feeds and the entries already extracted."""
+
+    def __init__(self, path="crawl.db"):
+        """
+        Open (or create) the crawl state database.
+
+        Args:
+            path (str, optional): Path to the SQLite database file. Defaults to "crawl.db".
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS feeds (
+                    url TEXT PRIMARY KEY,
+                    etag TEXT,
+                    last_modified TEXT,
+                    fetched_at REAL NOT NULL
+                )"""
+            )
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS entries (
+                    url TEXT PRIMARY KEY,
+                    stamp TEXT,
+                    extracted_at REAL NOT NULL
+                )"""
+            )
+
+    def close(self):
+        """Close the underlying database connection."""
+        with self._lock:
+            self._conn.close()
+
+    def get_validators(self, feed_url):
+        """
+        Get the cache validators of the last successful fetch of a feed.
+
+        Args:
+            feed_url (str): The feed URL
+
+        Returns:
+            tuple: (etag, last_modified), each possibly None
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT etag, last_modified FROM feeds WHERE url = ?", (feed_url,)
+            ).fetchone()
+        return (row["etag"], row["last_modified"]) if row else (None, None)
+
+    def set_validators(self, feed_url, etag, last_modified):
+        """Remember the cache validators of a feed."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                """INSERT OR REPLACE INTO feeds (url, etag, last_modified, fetched_at)
+                   VALUES (?, ?, ?, ?)""",
+                (feed_url, etag, last_modified, time.time()),
+            )
+
+    def is_new_or_changed(self, url, stamp):
+        """
+        Check whether an entry needs to be extracted.
+
+        Args:
+            url (str): The entry URL
+            stamp (str): The last modification marker advertised by the feed, or None
+
+        Returns:
+            bool: True if the entry was never extracted or its stamp changed
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT stamp FROM entries WHERE url = ?", (url,)).fetchone()
+        if row is None:
+            return True
+        return stamp is not None and stamp != row["stamp"]
+
+    def mark_extracted(self, url, stamp):
+        """Remember that an entry was extracted at the given stamp."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (url, stamp, extracted_at) VALUES (?, ?, ?)",
+                (url, stamp, time.time()),
+            )
+
+
+class FeedCrawler:
+    """Extracts the new and changed entries of RSS/Atom feeds and sitemaps."""
+
+    def __init__(self, store, extractor=None, max_workers=8, max_sitemaps=50, content_store=None):
+        """
+        Initialize the crawler.
+
+        Args:
+            store (CrawlStore): Memory of crawled feeds and extracted entries
+            extractor (ContentExtractor, optional): Extractor used for feeds and entries. Defaults to a new instance.
+            max_workers (int, optional): Maximum number of entries extracted concurrently. Defaults to 8.
+            max_sitemaps (int, optional): Maximum number of documents fetched when following sitemap indexes. Defaults to 50.
+            content_store (ContentStore, optional): Store used to detect duplicate contents. Defaults to no detection.
+        """
+        self.store = store
+        self.extractor = extractor or ContentExtractor()
+        self.max_workers = max_workers
+        self.max_sitemaps = max_sitemaps
+        self.content_store = content_store
+
+    def crawl(self, feed_url, limit=None, timeout=10, suppress_duplicates=False):
+        """
+        Crawl a feed or sitemap and extract its new or changed entries.
+
+        Args:
+            feed_url (str): URL of the RSS/Atom feed, sitemap or sitemap index
+            limit (int, optional): Maximum number of entries to extract. Defaults to no limit.
+            timeout (int, optional): Request timeout in seconds for the feed. Defaults to 10.
+            suppress_duplicates (bool, optional): Report entries duplicating an earlier extraction
+                in "duplicates" instead of "results". Requires a content store. Defaults to False.
+
+        Returns:
+            dict: Dictionary containing the feed URL, whether it was modified, the
+                number of entries seen, the extraction results, the suppressed
+                duplicates and the errors
+
+        Raises:
+            ValueError: If the URL is invalid
+            requests.exceptions.RequestException: If fetching the feed fails
+        """
+        logger.info(f"Crawling feed: {feed_url}")
+        # Fetched documents by URL: None when not modified, otherwise their validators,
+        # the entries they contributed to the pending list and their child sitemaps
+        documents = {}
+        pending = {}
+        seen = 0
+        modified = False
+        feeds = [feed_url]
+        queued = {feed_url}
+        fetched = 0
+        while feeds and fetched < self.max_sitemaps:
+            current = feeds.pop(0)
+            fetched += 1
+            # Only the top-level feed failing is fatal
+            try:
+                fetched_document = self._fetch_entries(current, timeout)
+                if fetched_document is None:
+                    documents[current] = None
+                    continue
+                entries, validators = fetched_document
+                document = documents[current] = {"validators": validators, "pending": [], "children": []}
+                modified = True
+                # Entries are checked as they are parsed rather than collected first
+                for kind, url, stamp in entries:
+                    if kind == 'sitemap':
+                        document["children"].append(url)
+                        if url not in queued:
+                            queued.add(url)
+                            feeds.append(url)
+                        continue
+                    seen += 1
+                    if url in pending or self.store.is_new_or_changed(url, stamp):
+                        pending.setdefault(url, stamp)
+                        document["pending"].append(url)
+            except (requests.exceptions.RequestException, ValueError):
+                if current == feed_url:
+                    raise
+                # A document that failed while being parsed is not complete
+                documents.pop(current, None)
+                continue
+
+        pending = list(pending.items())
+        if limit is not None:
+            pending = pending[:limit]
+
+        results = []
+        duplicates = []
+        errors = []
+        extracted = set()
+        if pending:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                outcomes = executor.map(lambda entry: self._extract_entry(*entry), pending)
+                for (url, _), (result, error) in zip(pending, outcomes):
+                    if error is not None:
+                        errors.append({"url": url, "error": error})
+                        continue
+                    extracted.add(url)
+                    if result["duplicate_of"] and suppress_duplicates:
+                        duplicates.append({"url": url, "duplicate_of": result["duplicate_of"]})
+                    else:
+                        results.append(result)
+
+        self._save_validators(documents, extracted)
+
+        return {
+            "feed": feed_url,
+            "modified": modified,
+            "entries": seen,
+            "results": results,
+            "duplicates": duplicates,
+            "errors": errors,
+        }
+
+    def _save_validators(self, documents, extracted):
+        """
+        Remember the validators of the documents whose pending entries were all extracted.
+
+        A document with entries left over (cut by the limit or failed), or with a child
+        sitemap that was not fully processed, has its validators cleared so the next
+        crawl fetches it again instead of getting a 304 and losing those entries.
+        """
+        def is_complete(url, visiting):
+            if url not in documents:
+                # Not fetched: failed or beyond max_sitemaps
+                return False
+            document = documents[url]
+            if document is None or url in visiting:
+                return True
+            visiting = visiting | {url}
+            return (all(entry in extracted for entry in document["pending"])
+                    and all(is_complete(child, visiting) for child in document["children"]))
+
+        for url, document in documents.items():
+            if document is None:
+                continue
+            if is_complete(url, frozenset()):
+                self.store.set_validators(url, *document["validators"])
+            else:
+                self.store.set_validators(url, None, None)
+
+    def _fetch_entries(self, feed_url, timeout):
+        """
+        Fetch a feed with a conditional GET and parse its entries.
+
+        Returns:
+            tuple: (entries, validators) where entries is an iterator of (kind, url, stamp)
+                tuples parsed as the response is downloaded, and validators the
+                (etag, last_modified) of the response, or None if the feed was not modified
+        """
+        if not self.extractor.validate_url(feed_url):
+            raise ValueError(f"Invalid URL: {feed_url}")
+
+        etag, last_modified = self.store.get_validators(feed_url)
+        headers = {}
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+
+        try:
+            response = self.extractor.session.get(feed_url, headers=headers, timeout=timeout, stream=True)
+            if response.status_code == 304:
+                logger.info(f"Feed not modified: {feed_url}")
+                response.close()
+                return None
+            try:
+                response.raise_for_status()
+            except requests.exceptions.RequestException:
+                response.close()
+                raise
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Error fetching feed {feed_url}: {str(e)}")
+            raise
+
+        def entries():
+            with response:
+                try:
+                    yield from parse_feed(response.iter_content(chunk_size=64 * 1024))
+                except requests.exceptions.RequestException as e:
+                    logger.error(f"Error fetching feed {feed_url}: {str(e)}")
+                    raise
+                except ET.ParseError as e:
+                    raise ValueError(f"Invalid feed {feed_url}: {str(e)}")
+
+        return entries(), (response.headers.get('ETag'), response.headers.get('Last-Modified'))
+
+    def _extract_entry(self, url, stamp):
+        """Extract an entry and remember it on success, returning (result, error)."""
+        try:
+            result = self.extractor.extract_from_url(url)
+            result["duplicate_of"] = self.content_store.put(result) if self.content_store else None
+        except Exception as e:
+            logger.error(f"Error processing entry {url}: {str(e)}")
+            return None, str(e)
+        self.store.mark_extracted(url, stamp)
+        return result, None
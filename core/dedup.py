@@ -0,0 +1,217 @@
+"""
+Content-addressed storage and near-duplicate detection of extraction results.
+Bodies are stored once per exact content hash, and SimHash signatures are
+indexed by bands so near-duplicates are found without scanning every document.
+
+The store keeps one document per distinct URL and has no eviction, so it grows
+without bound with the number of URLs extracted.
+"""
+
+import sqlite3
+import threading
+import time
+
+from .extractor import SIMHASH_BITS, hamming_distance
+
+# Signatures within this many differing bits are considered near-duplicates
+DEFAULT_MAX_DISTANCE = 3
+
+# Number of bands the signature is split into for indexing. Two signatures
+# within DEFAULT_MAX_DISTANCE bits always share at least one identical band.
+BANDS = DEFAULT_MAX_DISTANCE + 1
+BAND_BITS = SIMHASH_BITS // BANDS
+
+
+def _bands(signature):
+    """Split a hex SimHash signature into its band values."""
+    value = int(signature, 16)
+    mask = (1 << BAND_BITS) - 1
+    return [(value >> (band * BAND_BITS)) & mask for band in range(BANDS)]
+
+
+class ContentStore:
+    """SQLite-backed content-addressed store of extracted bodies with a near-duplicate index."""
+
+    def __init__(self, path="content.db", max_distance=DEFAULT_MAX_DISTANCE):
+        """
+        Open (or create) the content database.
+
+        Args:
+            path (str, optional): Path to the SQLite database file. Defaults to "content.db".
+            max_distance (int, optional): Maximum SimHash distance of near-duplicates. Defaults to 3.
+        """
+        if max_distance > DEFAULT_MAX_DISTANCE:
+            raise ValueError(f"max_distance cannot exceed {DEFAULT_MAX_DISTANCE}")
+        self.path = path
+        self.max_distance = max_distance
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS contents (
+                    hash TEXT PRIMARY KEY,
+                    content TEXT NOT NULL,
+                    retained INTEGER NOT NULL DEFAULT 0
+                )"""
+            )
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS documents (
+                    url TEXT PRIMARY KEY,
+                    content_hash TEXT NOT NULL,
+                    simhash TEXT NOT NULL,
+                    stored_at REAL NOT NULL
+                )"""
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_documents_hash ON documents (content_hash, stored_at)"
+            )
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS simhash_bands (
+                    band INTEGER NOT NULL,
+                    value INTEGER NOT NULL,
+                    url TEXT NOT NULL,
+                    PRIMARY KEY (band, value, url)
+                )"""
+            )
+
+    def close(self):
+        """Close the underlying database connection."""
+        with self._lock:
+            self._conn.close()
+
+    def put(self, result):
+        """
+        Store an extraction result and look for an earlier duplicate of it.
+
+        The body is stored once per content hash; storing an identical body again
+        only records the URL. When the content of a URL changes, its previous body is
+        deleted unless another document references it or it was retained. Empty bodies
+        are never reported as duplicates.
+
+        Args:
+            result (dict): Result of `ContentExtractor.extract_content`
+
+        Returns:
+            str: URL of an earlier document with identical or nearly identical content, or None
+        """
+        url = result["url"]
+        digest = result["content_hash"]
+        signature = result["simhash"]
+        with self._lock, self._conn:
+            duplicate_of = None
+            if result["content"]:
+                duplicate_of = self._find_duplicate(url, digest, signature)
+
+            self._conn.execute(
+                "INSERT OR IGNORE INTO contents (hash, content) VALUES (?, ?)",
+                (digest, result["content"]),
+            )
+            previous = self._conn.execute(
+                "SELECT content_hash FROM documents WHERE url = ?", (url,)
+            ).fetchone()
+            self._conn.execute(
+                """INSERT INTO documents (url, content_hash, simhash, stored_at) VALUES (?, ?, ?, ?)
+                   ON CONFLICT (url) DO UPDATE SET content_hash = excluded.content_hash, simhash = excluded.simhash""",
+                (url, digest, signature, time.time()),
+            )
+            self._conn.execute("DELETE FROM simhash_bands WHERE url = ?", (url,))
+            if result["content"]:
+                self._conn.executemany(
+                    "INSERT INTO simhash_bands (band, value, url) VALUES (?, ?, ?)",
+                    ((band, value, url) for band, value in enumerate(_bands(signature))),
+                )
+            if previous and previous["content_hash"] != digest:
+                self._conn.execute(
+                    """DELETE FROM contents WHERE hash = ? AND retained = 0
+                       AND NOT EXISTS (SELECT 1 FROM documents WHERE content_hash = ?)""",
+                    (previous["content_hash"], previous["content_hash"]),
+                )
+        return duplicate_of
+
+    def retain(self, content_hash):
+        """
+        Keep a body even once no document references it anymore, until it is released.
+
+        Used by stores that hold results referencing bodies by hash, such as job results.
+        Each call must be matched by a call to `release` once the reference is dropped.
+
+        Args:
+            content_hash (str): Hash of the body to keep
+        """
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE contents SET retained = retained + 1 WHERE hash = ?", (content_hash,))
+
+    def release(self, content_hash):
+        """
+        Drop a reference taken with `retain`, deleting the body once it is not referenced anymore.
+
+        Args:
+            content_hash (str): Hash of the body to release
+        """
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE contents SET retained = retained - 1 WHERE hash = ? AND retained > 0", (content_hash,)
+            )
+            self._conn.execute(
+                """DELETE FROM contents WHERE hash = ? AND retained = 0
+                   AND NOT EXISTS (SELECT 1 FROM documents WHERE content_hash = ?)""",
+                (content_hash, content_hash),
+            )
+
+    def _find_duplicate(self, url, digest, signature):
+        # A URL stored again is only a duplicate of documents stored before it first was
+        own = self._conn.execute("SELECT stored_at FROM documents WHERE url = ?", (url,)).fetchone()
+        before = own["stored_at"] if own else float("inf")
+
+        row = self._conn.execute(
+            """SELECT url FROM documents WHERE content_hash = ? AND url != ? AND stored_at < ?
+               ORDER BY stored_at LIMIT 1""",
+            (digest, url, before),
+        ).fetchone()
+        if row:
+            return row["url"]
+
+        candidates = set()
+        for band, value in enumerate(_bands(signature)):
+            candidates.update(
+                r["url"]
+                for r in self._conn.execute(
+                    "SELECT url FROM simhash_bands WHERE band = ? AND value = ? AND url != ?",
+                    (band, value, url),
+                )
+            )
+        best = None
+        for candidate in candidates:
+            document = self._conn.execute(
+                "SELECT simhash, stored_at FROM documents WHERE url = ?", (candidate,)
+            ).fetchone()
+            if document and document["stored_at"] < before and hamming_distance(signature, document["simhash"]) <= self.max_distance:
+                if best is None or document["stored_at"] < best[1]:
+                    best = (candidate, document["stored_at"])
+        return best[0] if best else None
+
+    def get_contents(self, hashes):
+        """
+        Load stored bodies by content hash.
+
+        Args:
+            hashes (iterable): Content hashes to load
+
+        Returns:
+            dict: Mapping of content hash to body for the hashes found
+        """
+        hashes = list(set(hashes))
+        contents = {}
+        with self._lock:
+            for start in range(0, len(hashes), 500):
+                chunk = hashes[start:start + 500]
+                placeholders = ", ".join("?" * len(chunk))
+                contents.update(
+                    (row["hash"], row["content"])
+                    for row in self._conn.execute(
+                        f"SELECT hash, content FROM contents WHERE hash IN ({placeholders})", chunk
+                    )
+                )
+        return contents
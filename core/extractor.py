@@ -3,9 +3,15 @@ Core module for extracting content from web pages.
 This provides the fundamental extraction logic independent of delivery method.
 """
 
+import hashlib
 import logging
+import queue
+import re
+import threading
+import time
 import requests
 from bs4 import BeautifulSoup
+from collections import deque
 from urllib.parse import urlparse
 
 # Configure logging
@@ -13,17 +19,182 @@ logging.basicConfig(level=logging.INFO,
                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+SIMHASH_BITS = 64
+
+# Share of a deadline budget kept for parsing and extraction after the fetch
+PARSE_BUDGET_SHARE = 0.2
+
+# Conservative estimate of the parse and extraction throughput of tag-dense pages, in
+# characters per second, used until enough pages were measured
+INITIAL_PARSE_RATE = 200000
+
+# Number of recent parse throughputs kept, the slowest of which is used as the estimate
+PARSE_RATE_HISTORY = 50
+PARSE_RATE_MIN_SAMPLES = 10
+
+# Pages shorter than this are not measured, as fixed costs dominate their parse time
+PARSE_RATE_MIN_LENGTH = 10000
+
+# Number of recent fetch durations kept per origin to compute the hedging delay
+HEDGE_HISTORY = 100
+HEDGE_MIN_SAMPLES = 20
+
+class DeadlineExceeded(requests.exceptions.Timeout):
+    """Raised when the deadline passes before any part of the page was received."""
+
+def parse_deadline_ms(value):
+    """
+    Parse the `deadline_ms` request parameter of the cloud function handlers.
+    
+    Args:
+        value (str): The raw parameter value, or None when it was not given
+        
+    Returns:
+        int: The latency budget in milliseconds, or None when not given
+        
+    Raises:
+        ValueError: If the value is not a positive integer
+    """
+    if value is None or value == "":
+        return None
+    try:
+        deadline_ms = int(value)
+    except ValueError:
+        deadline_ms = 0
+    if deadline_ms < 1:
+        raise ValueError(f"Invalid deadline_ms: {value!r} is not a positive integer number of milliseconds")
+    return deadline_ms
+
+class _Download:
+    """A single streamed download, run in its own thread so it can be abandoned."""
+    
+    def __init__(self, session, url, timeout, done):
+        self.session = session
+        self.url = url
+        self.timeout = timeout
+        self.done = done
+        self.chunks = []
+        self.response = None
+        self.error = None
+        self.cancelled = False
+        self.started_at = time.monotonic()
+        threading.Thread(target=self._run, daemon=True).start()
+    
+    def _run(self):
+        try:
+            self.response = self.session.get(self.url, timeout=self.timeout, stream=True)
+            if self.cancelled:
+                self.response.close()
+                return
+            self.response.raise_for_status()
+            raw = self.response.raw
+            if hasattr(raw, 'read1'):
+                # Take whatever has arrived, so slow-drip bodies still yield partial content
+                chunks = iter(lambda: raw.read1(16 * 1024, decode_content=True), b"")
+            else:
+                chunks = self.response.iter_content(chunk_size=1024)
+            for chunk in chunks:
+                if self.cancelled:
+                    break
+                self.chunks.append(chunk)
+        except Exception as e:
+            self.error = e
+        finally:
+            self.done.put(self)
+    
+    def cancel(self):
+        """Stop the download, closing the connection to unblock a pending read."""
+        self.cancelled = True
+        if self.response is not None:
+            self.response.close()
+    
+    def text(self):
+        """Decode the body received so far."""
+        encoding = (self.response.encoding if self.response is not None else None) or 'utf-8'
+        return b"".join(self.chunks).decode(encoding, errors='replace')
+
+def content_hash(text):
+    """
+    Compute the exact fingerprint of a text, ignoring whitespace differences.
+    
+    Args:
+        text (str): The text to fingerprint
+        
+    Returns:
+        str: Hex SHA-256 digest of the whitespace-normalized text
+    """
+    normalized = " ".join(text.split())
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+# Byte translation tables mapping each byte to the value of one of its bits
+_BIT_TABLES = [bytes((value >> bit) & 1 for value in range(256)) for bit in range(8)]
+
+def simhash(text, shingle_size=3):
+    """
+    Compute the SimHash near-duplicate signature of a text.
+    
+    Texts sharing most of their word shingles get signatures that differ
+    in only a few bits (see `hamming_distance`).
+    
+    Args:
+        text (str): The text to fingerprint
+        shingle_size (int, optional): Number of words per shingle. Defaults to 3.
+        
+    Returns:
+        str: The 64-bit signature as a hex string
+    """
+    tokens = re.findall(r'\w+', text.lower())
+    if len(tokens) < shingle_size:
+        shingles = [" ".join(tokens)]
+    else:
+        shingles = list(map(" ".join, zip(*(tokens[i:] for i in range(shingle_size)))))
+    
+    # Lay the shingle hashes out as big-endian bytes, then count the set bits of each bit
+    # position by translating the column of bytes holding it into 0/1 values
+    digests = b"".join(
+        hashlib.blake2b(shingle.encode('utf-8'), digest_size=SIMHASH_BITS // 8).digest() for shingle in shingles
+    )
+    signature = 0
+    for bit in range(SIMHASH_BITS):
+        column = digests[SIMHASH_BITS // 8 - 1 - bit // 8::SIMHASH_BITS // 8]
+        if column.translate(_BIT_TABLES[bit % 8]).count(1) * 2 > len(shingles):
+            signature |= 1 << bit
+    return f"{signature:016x}"
+
+def hamming_distance(signature_a, signature_b):
+    """
+    Count the differing bits between two SimHash signatures.
+    
+    Args:
+        signature_a (str): Hex signature
+        signature_b (str): Hex signature
+        
+    Returns:
+        int: Number of differing bits
+    """
+    return bin(int(signature_a, 16) ^ int(signature_b, 16)).count('1')
+
 class ContentExtractor:
     """Class for extracting main content from web pages."""
     
-    def __init__(self, user_agent=None):
+    def __init__(self, user_agent=None, hedge=False, hedge_tail_ratio=2.0):
         """
         Initialize the content extractor.
         
         Args:
             user_agent (str, optional): Custom user agent string. Defaults to a standard browser.
+            hedge (bool, optional): Start a duplicate fetch when an origin with high tail latency
+                is slower than its p95 fetch time. Defaults to False.
+            hedge_tail_ratio (float, optional): Minimum ratio between the p99 and p95 fetch
+                times of an origin for its fetches to be hedged. Defaults to 2.0.
         """
         self.session = requests.Session()
+        self.hedge = hedge
+        self.hedge_tail_ratio = hedge_tail_ratio
+        self._latencies = {}
+        self._latencies_lock = threading.Lock()
+        self._parse_rates = deque(maxlen=PARSE_RATE_HISTORY)
+        self._parse_rates_lock = threading.Lock()
         
         # Set a user agent to avoid being blocked by some websites
         default_user_agent = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
@@ -47,32 +218,137 @@ class ContentExtractor:
         except:
             return False
     
-    def fetch_page(self, url, timeout=10):
+    def fetch_page(self, url, timeout=10, deadline=None, hedge=None):
         """
         Fetch the web page content.
         
         Args:
             url (str): The URL to fetch
             timeout (int, optional): Request timeout in seconds. Defaults to 10.
+            deadline (float, optional): Absolute `time.monotonic()` time by which the fetch must
+                end, covering DNS, connect and download. Defaults to no deadline.
+            hedge (bool, optional): Whether the fetch may be hedged. Defaults to the extractor setting.
             
         Returns:
-            str: The HTML content of the page
+            str: The HTML content of the page, possibly cut short by the deadline
             
         Raises:
             ValueError: If the URL is invalid
             requests.exceptions.RequestException: If the request fails
+            DeadlineExceeded: If the deadline passes before any content was received
+        """
+        return self._fetch(url, timeout, deadline, hedge=hedge)[0]
+    
+    def _fetch(self, url, timeout, deadline, hedge=None):
+        """
+        Fetch a page, returning its content and whether the deadline cut it short.
+        `hedge` overrides the extractor setting when given.
         """
         if not self.validate_url(url):
             raise ValueError(f"Invalid URL: {url}")
         
+        hedge = self.hedge if hedge is None else hedge
         try:
-            response = self.session.get(url, timeout=timeout)
-            response.raise_for_status()  # Raise exception for HTTP errors
-            return response.text
+            if deadline is None and not hedge:
+                response = self.session.get(url, timeout=timeout)
+                response.raise_for_status()  # Raise exception for HTTP errors
+                return response.text, False
+            return self._fetch_streamed(url, timeout, deadline, hedge)
         except requests.exceptions.RequestException as e:
             logger.error(f"Error fetching URL {url}: {str(e)}")
             raise
     
+    def _fetch_streamed(self, url, timeout, deadline, hedge):
+        """
+        Fetch a page in background downloads that can be hedged and abandoned at the deadline.
+        """
+        origin = urlparse(url).netloc
+        hedge_delay = self._hedge_delay(origin) if hedge else None
+        done = queue.Queue()
+        
+        def start_download():
+            remaining = deadline - time.monotonic() if deadline is not None else timeout
+            return _Download(self.session, url, max(min(timeout, remaining), 0.001), done)
+        
+        downloads = [start_download()]
+        hedge_at = downloads[0].started_at + hedge_delay if hedge_delay is not None else None
+        failed = []
+        try:
+            while True:
+                now = time.monotonic()
+                waits = [when - now for when in (deadline, hedge_at) if when is not None]
+                try:
+                    download = done.get(timeout=max(min(waits), 0) if waits else None)
+                except queue.Empty:
+                    if hedge_at is not None and time.monotonic() >= hedge_at:
+                        logger.info(f"Hedging fetch of {url} after {hedge_delay:.3f}s")
+                        downloads.append(start_download())
+                        hedge_at = None
+                        continue
+                    # Deadline reached: keep the most complete body received so far
+                    best = max(downloads, key=lambda d: sum(len(c) for c in d.chunks))
+                    if not best.chunks:
+                        raise DeadlineExceeded(f"Deadline exceeded before receiving {url}")
+                    logger.warning(f"Deadline exceeded while fetching {url}, returning partial content")
+                    return best.text(), True
+                
+                if download.error is None:
+                    self._record_latency(origin, time.monotonic() - download.started_at)
+                    return download.text(), False
+                # A failed fetch is not hedged; only fail once every started download failed
+                failed.append(download)
+                if len(failed) == len(downloads):
+                    raise download.error
+        finally:
+            for download in downloads:
+                download.cancel()
+    
+    def _record_latency(self, origin, duration):
+        with self._latencies_lock:
+            self._latencies.setdefault(origin, deque(maxlen=HEDGE_HISTORY)).append(duration)
+    
+    def _hedge_delay(self, origin):
+        """Get the delay after which to hedge a fetch from an origin, or None to not hedge."""
+        with self._latencies_lock:
+            durations = sorted(self._latencies.get(origin, ()))
+        if len(durations) < HEDGE_MIN_SAMPLES:
+            return None
+        p95 = durations[min(len(durations) - 1, int(len(durations) * 0.95))]
+        p99 = durations[min(len(durations) - 1, int(len(durations) * 0.99))]
+        if p99 < p95 * self.hedge_tail_ratio:
+            return None
+        return p95
+    
+    def parse_html(self, html):
+        """
+        Parse HTML into a document tree.
+        
+        Args:
+            html (str): HTML content of the page
+            
+        Returns:
+            BeautifulSoup: The parsed document
+        """
+        return BeautifulSoup(html, 'html.parser')
+    
+    def _parse_rate(self):
+        """Get a pessimistic estimate of the parse and extraction throughput in characters per second."""
+        with self._parse_rates_lock:
+            rates = list(self._parse_rates)
+        if len(rates) < PARSE_RATE_MIN_SAMPLES:
+            return min([INITIAL_PARSE_RATE] + rates)
+        return min(rates)
+    
+    def _extract_timed(self, html, url):
+        """Extract content from HTML, recording the parse and extraction throughput."""
+        start = time.monotonic()
+        result = self.extract_content(html, url)
+        elapsed = time.monotonic() - start
+        if len(html) >= PARSE_RATE_MIN_LENGTH and elapsed > 0:
+            with self._parse_rates_lock:
+                self._parse_rates.append(len(html) / elapsed)
+        return result
+    
     def extract_content(self, html, url):
         """
         Extract the main content from HTML.
@@ -82,10 +358,21 @@ class ContentExtractor:
             url (str): Original URL (for reference)
             
         Returns:
-            dict: Dictionary containing title, content, URL and word count
+            dict: Dictionary containing title, content, URL, word count and content fingerprints
+        """
+        return self.extract_from_soup(self.parse_html(html), url)
+    
+    def extract_from_soup(self, soup, url):
         """
-        soup = BeautifulSoup(html, 'html.parser')
+        Extract the main content from a parsed document. The document is modified in place.
         
+        Args:
+            soup (BeautifulSoup): The parsed document
+            url (str): Original URL (for reference)
+            
+        Returns:
+            dict: Dictionary containing title, content, URL, word count and content fingerprints
+        """
         # Remove unwanted elements
         for element in soup.select('script, style, nav, footer, header, aside, iframe, .ad, .ads, .advertisement'):
             element.extract()
@@ -135,19 +422,40 @@ class ContentExtractor:
             "title": title,
             "content": text_content,
             "url": url,
-            "word_count": len(text_content.split()) if text_content else 0
+            "word_count": len(text_content.split()) if text_content else 0,
+            "content_hash": content_hash(text_content),
+            "simhash": simhash(text_content)
         }
     
-    def extract_from_url(self, url):
+    def extract_from_url(self, url, deadline=None):
         """
         Extract content from a given URL.
         
         Args:
             url (str): The URL to extract content from
+            deadline (float, optional): Absolute `time.monotonic()` time by which the fetch, parse
+                and extraction must end. Part of the budget is kept for parsing; the download
+                stops when the rest runs out, and the page is cut to what can be parsed in the
+                remaining time. Either way the result is flagged as partial. Defaults to no deadline.
             
         Returns:
-            dict: Dictionary containing title, content, URL and word count
+            dict: Dictionary containing title, content, URL, word count, content fingerprints
+                and whether the content is partial
         """
         logger.info(f"Extracting content from URL: {url}")
-        html = self.fetch_page(url)
-        return self.extract_content(html, url)
\ No newline at end of file
+        if deadline is None:
+            html, partial = self._fetch(url, 10, None)
+        else:
+            fetch_deadline = deadline - (deadline - time.monotonic()) * PARSE_BUDGET_SHARE
+            html, partial = self._fetch(url, 10, fetch_deadline)
+            
+            # Parsing cannot be interrupted, so only parse what fits in the remaining budget
+            max_length = max(int((deadline - time.monotonic()) * self._parse_rate()), 0)
+            if len(html) > max_length:
+                logger.warning(f"Deadline too close to parse all of {url}, cutting it to {max_length} characters")
+                html = html[:max_length]
+                partial = True
+        
+        result = self._extract_timed(html, url)
+        result["partial"] = partial
+        return result
\ No newline at end of file
@@ -0,0 +1,449 @@
+"""
+Asynchronous job processing for large extraction batches.
+Jobs and their per-URL results are persisted in a local SQLite database so that
+they survive restarts and can be resumed where they stopped.
+
+Several processes (e.g. server workers) can share the same database: items are
+claimed atomically and leased, so an item is only extracted again once the lease
+of the process that claimed it expired.
+"""
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from .extractor import ContentExtractor
+
+logger = logging.getLogger(__name__)
+
+# Job lifecycle states
+JOB_PENDING = "pending"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+
+# Item lifecycle states
+ITEM_PENDING = "pending"
+ITEM_PROCESSING = "processing"
+ITEM_DONE = "done"
+ITEM_FAILED = "failed"
+ITEM_DUPLICATE = "duplicate"
+
+# Seconds after which an item claimed by a process that did not finish it may be claimed again
+DEFAULT_LEASE_TIMEOUT = 300
+
+# Seconds between checks of a job whose remaining items are being processed by another process
+POLL_INTERVAL = 5
+
+
+class JobStore:
+    """SQLite-backed persistence for extraction jobs and their results."""
+
+    def __init__(self, path="jobs.db", content_store=None, lease_timeout=DEFAULT_LEASE_TIMEOUT):
+        """
+        Open (or create) the job database.
+
+        Args:
+            path (str, optional): Path to the SQLite database file. Defaults to "jobs.db".
+            content_store (ContentStore, optional): Content-addressed store holding the result
+                bodies. Defaults to storing bodies inline with each result.
+            lease_timeout (float, optional): Seconds after which an item claimed but not finished
+                may be claimed again. Defaults to 300.
+        """
+        self.path = path
+        self.content_store = content_store
+        self.lease_timeout = lease_timeout
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    total INTEGER NOT NULL,
+                    suppress_duplicates INTEGER NOT NULL DEFAULT 0,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )"""
+            )
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS job_items (
+                    job_id TEXT NOT NULL,
+                    position INTEGER NOT NULL,
+                    url TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    result TEXT,
+                    error TEXT,
+                    duplicate_of TEXT,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    claimed_at REAL,
+                    PRIMARY KEY (job_id, position)
+                )"""
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_job_items_status ON job_items (job_id, status)"
+            )
+
+    def close(self):
+        """Close the underlying database connection."""
+        with self._lock:
+            self._conn.close()
+
+    def create_job(self, urls, suppress_duplicates=False):
+        """
+        Persist a new job.
+
+        Args:
+            urls (list): URLs to extract content from
+            suppress_duplicates (bool, optional): Omit the results of duplicate contents. Defaults to False.
+
+        Returns:
+            str: The identifier of the new job
+        """
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                """INSERT INTO jobs (id, status, total, suppress_duplicates, created_at, updated_at)
+                   VALUES (?, ?, ?, ?, ?, ?)""",
+                (job_id, JOB_PENDING, len(urls), int(suppress_duplicates), now, now),
+            )
+            self._conn.executemany(
+                "INSERT INTO job_items (job_id, position, url, status) VALUES (?, ?, ?, ?)",
+                ((job_id, position, url, ITEM_PENDING) for position, url in enumerate(urls)),
+            )
+        return job_id
+
+    def get_job(self, job_id):
+        """
+        Get a job with its progress counters.
+
+        Args:
+            job_id (str): The job identifier
+
+        Returns:
+            dict: The job description, or None if the job does not exist
+        """
+        with self._lock:
+            job = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if job is None:
+                return None
+            counts = dict(
+                self._conn.execute(
+                    "SELECT status, COUNT(*) FROM job_items WHERE job_id = ? GROUP BY status",
+                    (job_id,),
+                ).fetchall()
+            )
+        return {
+            "id": job["id"],
+            "status": job["status"],
+            "total": job["total"],
+            "pending": counts.get(ITEM_PENDING, 0) + counts.get(ITEM_PROCESSING, 0),
+            "done": counts.get(ITEM_DONE, 0),
+            "failed": counts.get(ITEM_FAILED, 0),
+            "duplicates": counts.get(ITEM_DUPLICATE, 0),
+            "suppress_duplicates": bool(job["suppress_duplicates"]),
+            "created_at": job["created_at"],
+            "updated_at": job["updated_at"],
+        }
+
+    def get_results(self, job_id, offset=0, limit=100):
+        """
+        Page through the items of a job in submission order.
+
+        Args:
+            job_id (str): The job identifier
+            offset (int, optional): Position of the first item to return. Defaults to 0.
+            limit (int, optional): Maximum number of items to return. Defaults to 100.
+
+        Returns:
+            list: Dictionaries containing position, URL, status, result, error and duplicate reference
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                """SELECT position, url, status, result, error, duplicate_of FROM job_items
+                   WHERE job_id = ? AND position >= ? ORDER BY position LIMIT ?""",
+                (job_id, offset, limit),
+            ).fetchall()
+        results = [json.loads(row["result"]) if row["result"] else None for row in rows]
+
+        # Bodies stored in the content store are loaded back by content hash
+        if self.content_store:
+            missing = [r["content_hash"] for r in results if r and "content" not in r]
+            contents = self.content_store.get_contents(missing) if missing else {}
+            for result in results:
+                if result and "content" not in result:
+                    result["content"] = contents.get(result["content_hash"], "")
+
+        return [
+            {
+                "position": row["position"],
+                "url": row["url"],
+                "status": row["status"],
+                "result": result,
+                "error": row["error"],
+                "duplicate_of": row["duplicate_of"],
+            }
+            for row, result in zip(rows, results)
+        ]
+
+    def claim_items(self, job_id, limit):
+        """
+        Atomically mark up to `limit` items of a job as processing.
+
+        Pending items are claimed, as well as items whose lease expired because the
+        process that claimed them stopped before finishing them.
+
+        Args:
+            job_id (str): The job identifier
+            limit (int): Maximum number of items to claim
+
+        Returns:
+            list: (position, url) tuples of the claimed items
+        """
+        now = time.time()
+        claimable = "(status = ? OR (status = ? AND claimed_at < ?))"
+        claimable_args = (ITEM_PENDING, ITEM_PROCESSING, now - self.lease_timeout)
+        claimed = []
+        with self._lock, self._conn:
+            # Take the write lock before reading so that other processes cannot claim the same items
+            self._conn.execute("BEGIN IMMEDIATE")
+            rows = self._conn.execute(
+                f"""SELECT position, url FROM job_items
+                    WHERE job_id = ? AND {claimable} ORDER BY position LIMIT ?""",
+                (job_id, *claimable_args, limit),
+            ).fetchall()
+            for row in rows:
+                cursor = self._conn.execute(
+                    f"""UPDATE job_items SET status = ?, claimed_at = ?, attempts = attempts + 1
+                        WHERE job_id = ? AND position = ? AND {claimable}""",
+                    (ITEM_PROCESSING, now, job_id, row["position"], *claimable_args),
+                )
+                if cursor.rowcount == 1:
+                    claimed.append((row["position"], row["url"]))
+            if claimed:
+                self._touch(job_id, JOB_RUNNING)
+        return claimed
+
+    def complete_item(self, job_id, position, result, duplicate_of=None):
+        """
+        Record the result of a processed item. Items already finished are left untouched.
+
+        When a content store is configured, the body is expected to be stored there
+        already and is left out of the job database; it is retained until the job is deleted.
+        """
+        result = {**result, "duplicate_of": duplicate_of}
+        if self.content_store:
+            self.content_store.retain(result["content_hash"])
+            del result["content"]
+        finished = self._finish_item(job_id, position, ITEM_DONE, json.dumps(result), None, duplicate_of)
+        if self.content_store and not finished:
+            self.content_store.release(result["content_hash"])
+
+    def suppress_item(self, job_id, position, duplicate_of):
+        """Record a processed item as a suppressed duplicate. Items already finished are left untouched."""
+        self._finish_item(job_id, position, ITEM_DUPLICATE, None, None, duplicate_of)
+
+    def fail_item(self, job_id, position, error):
+        """Record the failure of a processed item. Items already finished are left untouched."""
+        self._finish_item(job_id, position, ITEM_FAILED, None, error, None)
+
+    def _finish_item(self, job_id, position, status, result, error, duplicate_of):
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                """UPDATE job_items SET status = ?, result = ?, error = ?, duplicate_of = ?
+                   WHERE job_id = ? AND position = ? AND status = ?""",
+                (status, result, error, duplicate_of, job_id, position, ITEM_PROCESSING),
+            )
+        return cursor.rowcount == 1
+
+    def complete_job(self, job_id):
+        """
+        Mark a job as completed once none of its items is pending or processing.
+
+        Returns:
+            bool: True if the job is completed
+        """
+        with self._lock, self._conn:
+            unfinished = self._conn.execute(
+                "SELECT 1 FROM job_items WHERE job_id = ? AND status IN (?, ?) LIMIT 1",
+                (job_id, ITEM_PENDING, ITEM_PROCESSING),
+            ).fetchone()
+            if unfinished is None:
+                self._touch(job_id, JOB_COMPLETED)
+        return unfinished is None
+
+    def delete_job(self, job_id):
+        """
+        Delete a job and its results, releasing the bodies they retained in the content store.
+
+        Items of the job still being processed are discarded when they finish.
+
+        Args:
+            job_id (str): The job identifier
+
+        Returns:
+            bool: True if the job existed
+        """
+        with self._lock, self._conn:
+            rows = self._conn.execute(
+                "SELECT result FROM job_items WHERE job_id = ? AND status = ? AND result IS NOT NULL",
+                (job_id, ITEM_DONE),
+            ).fetchall()
+            self._conn.execute("DELETE FROM job_items WHERE job_id = ?", (job_id,))
+            deleted = self._conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,)).rowcount == 1
+        if self.content_store:
+            for row in rows:
+                self.content_store.release(json.loads(row["result"])["content_hash"])
+        return deleted
+
+    def _touch(self, job_id, status):
+        self._conn.execute(
+            "UPDATE jobs SET status = ?, updated_at = ? WHERE id = ?",
+            (status, time.time(), job_id),
+        )
+
+    def unfinished_jobs(self):
+        """
+        Get the jobs to resume after a restart.
+
+        Items being processed by a stopped process are claimed again once their
+        lease expires, so they are not reset here: other processes sharing the
+        database may still be processing them.
+
+        Returns:
+            list: Identifiers of the jobs that are not completed yet
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id FROM jobs WHERE status != ? ORDER BY created_at",
+                (JOB_COMPLETED,),
+            ).fetchall()
+        return [row["id"] for row in rows]
+
+
+class JobManager:
+    """Runs extraction jobs in the background with bounded concurrency."""
+
+    def __init__(self, store, extractor=None, max_workers=8):
+        """
+        Initialize the job manager.
+
+        Args:
+            store (JobStore): Persistence for jobs and results
+            extractor (ContentExtractor, optional): Extractor used to process URLs. Defaults to a new instance.
+            max_workers (int, optional): Maximum number of URLs extracted concurrently across all jobs. Defaults to 8.
+        """
+        self.store = store
+        self.extractor = extractor or ContentExtractor()
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job-worker")
+        self._stopping = threading.Event()
+        self._dispatchers = []
+
+    def start(self):
+        """Resume the jobs left unfinished by a previous run."""
+        for job_id in self.store.unfinished_jobs():
+            logger.info(f"Resuming job {job_id}")
+            self._dispatch(job_id)
+
+    def shutdown(self, wait_for_items=True):
+        """
+        Stop dispatching new items.
+
+        Args:
+            wait_for_items (bool, optional): Wait for in-flight items to finish. Defaults to True.
+        """
+        self._stopping.set()
+        self._executor.shutdown(wait=wait_for_items)
+        for dispatcher in self._dispatchers:
+            dispatcher.join()
+
+    def submit(self, urls, suppress_duplicates=False):
+        """
+        Create a job and start processing it in the background.
+
+        Args:
+            urls (list): URLs to extract content from
+            suppress_duplicates (bool, optional): Omit the results of contents that duplicate
+                an earlier extraction. Requires a content store. Defaults to False.
+
+        Returns:
+            str: The identifier of the new job
+        """
+        job_id = self.store.create_job(urls, suppress_duplicates=suppress_duplicates)
+        logger.info(f"Created job {job_id} with {len(urls)} URLs")
+        self._dispatch(job_id)
+        return job_id
+
+    def _dispatch(self, job_id):
+        dispatcher = threading.Thread(target=self._run_job, args=(job_id,), name=f"job-{job_id}", daemon=True)
+        self._dispatchers = [d for d in self._dispatchers if d.is_alive()]
+        self._dispatchers.append(dispatcher)
+        dispatcher.start()
+
+    def _run_job(self, job_id):
+        job = self.store.get_job(job_id)
+        if job is None:
+            # Deleted before it started
+            return
+        suppress_duplicates = job["suppress_duplicates"]
+        # Positions of the items being processed, by future
+        in_flight = {}
+        while True:
+            # Refill the free slots as soon as items finish, so one slow URL does not hold up the others
+            if not self._stopping.is_set():
+                free = self.max_workers - len(in_flight)
+                items = self.store.claim_items(job_id, free) if free > 0 else []
+                try:
+                    for position, url in items:
+                        future = self._executor.submit(self._process_item, job_id, position, url, suppress_duplicates)
+                        in_flight[future] = position
+                except RuntimeError:
+                    # The executor was shut down; items claimed but not submitted are claimed
+                    # again once their lease expires
+                    pass
+            if in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    self._check_item(job_id, in_flight.pop(future), future)
+                continue
+            if self._stopping.is_set():
+                break
+            if self.store.complete_job(job_id):
+                logger.info(f"Job {job_id} completed")
+                break
+            # The remaining items are claimed by another process: wait for them to
+            # finish, or for their lease to expire to claim them again
+            self._stopping.wait(min(POLL_INTERVAL, self.store.lease_timeout))
+
+    def _check_item(self, job_id, position, future):
+        """Record the failure of an item whose result could not be stored."""
+        error = future.exception()
+        if error is None:
+            return
+        logger.error(f"Job {job_id}: error storing item {position}: {str(error)}")
+        try:
+            self.store.fail_item(job_id, position, str(error))
+        except Exception as e:
+            # Left processing; it is claimed again once its lease expires
+            logger.error(f"Job {job_id}: error recording failure of item {position}: {str(e)}")
+
+    def _process_item(self, job_id, position, url, suppress_duplicates):
+        try:
+            result = self.extractor.extract_from_url(url)
+            content_store = self.store.content_store
+            duplicate_of = content_store.put(result) if content_store else None
+        except Exception as e:
+            logger.error(f"Job {job_id}: error processing URL {url}: {str(e)}")
+            self.store.fail_item(job_id, position, str(e))
+            return
+        if duplicate_of and suppress_duplicates:
+            self.store.suppress_item(job_id, position, duplicate_of)
+        else:
+            self.store.complete_item(job_id, position, result, duplicate_of=duplicate_of)
@@ -0,0 +1,180 @@
+"""
+On-demand profiling of a single fetch and extraction.
+Runs the fetch, parse and extract stages under cProfile and tracemalloc and
+reports where the time and the allocations go.
+"""
+
+import cProfile
+import io
+import logging
+import pstats
+import threading
+import time
+import tracemalloc
+
+from .extractor import ContentExtractor
+
+logger = logging.getLogger(__name__)
+
+# tracemalloc is process-wide, so profiling runs are serialized to keep their figures apart
+_profile_lock = threading.Lock()
+
+
+def _stage(profiler, function, *args):
+    """Run one stage under the profiler and measure its wall time and allocations."""
+    before = tracemalloc.take_snapshot()
+    if hasattr(tracemalloc, 'reset_peak'):
+        tracemalloc.reset_peak()
+    start_memory = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    profiler.enable()
+    try:
+        value = function(*args)
+    finally:
+        profiler.disable()
+    wall_time = time.perf_counter() - start
+    peak_memory = tracemalloc.get_traced_memory()[1]
+    after = tracemalloc.take_snapshot()
+
+    # Blocks and bytes still allocated at the end of the stage, per source line
+    differences = after.compare_to(before, 'lineno')
+    stats = {
+        "wall_time": wall_time,
+        "allocated_blocks": sum(d.count_diff for d in differences if d.count_diff > 0),
+        "allocated_bytes": sum(d.size_diff for d in differences if d.size_diff > 0),
+        "peak_bytes": max(peak_memory - start_memory, 0),
+    }
+    return value, stats, differences
+
+
+def _fetch_unhedged(extractor, url):
+    """Fetch a page in the calling thread, where cProfile can see it."""
+    return extractor.fetch_page(url, hedge=False)
+
+
+def _hot_functions(profiler, top):
+    """Get the functions with the highest own time from a profiler."""
+    stats = pstats.Stats(profiler, stream=io.StringIO())
+    rows = []
+    for (filename, line, name), (_, calls, tottime, cumtime, _) in stats.stats.items():
+        rows.append({
+            "function": f"{filename}:{line}({name})",
+            "calls": calls,
+            "own_time": tottime,
+            "cumulative_time": cumtime,
+        })
+    rows.sort(key=lambda row: row["own_time"], reverse=True)
+    return rows[:top]
+
+
+def profile_url(url, extractor=None, top=20):
+    """
+    Fetch and extract a URL under a deterministic profiler.
+
+    Wall times are measured with profiling enabled, so they are inflated
+    compared to an unprofiled run but remain comparable between stages.
+    tracemalloc traces the whole process: when other threads are busy, as in
+    a running server, their allocations are included in the figures.
+    The fetch is never hedged so that it runs in the profiled thread.
+
+    Args:
+        url (str): The URL to profile
+        extractor (ContentExtractor, optional): Extractor to profile. Defaults to a new instance.
+        top (int, optional): Number of hot functions and allocation sites to report. Defaults to 20.
+
+    Returns:
+        dict: Dictionary containing the page size, DOM node count, per-stage wall time and
+            allocations, the hottest functions, the top allocation sites, a summary of
+            the extraction result and notes on how to read the figures
+
+    Raises:
+        ValueError: If the URL is invalid
+        requests.exceptions.RequestException: If the request fails
+    """
+    extractor = extractor or ContentExtractor()
+    logger.info(f"Profiling extraction of URL: {url}")
+
+    with _profile_lock:
+        was_tracing = tracemalloc.is_tracing()
+        if not was_tracing:
+            tracemalloc.start()
+        profiler = cProfile.Profile()
+        try:
+            html, fetch_stats, fetch_differences = _stage(profiler, _fetch_unhedged, extractor, url)
+            soup, parse_stats, parse_differences = _stage(profiler, extractor.parse_html, html)
+            dom_nodes = len(soup.find_all(True))
+            result, extract_stats, extract_differences = _stage(profiler, extractor.extract_from_soup, soup, url)
+        finally:
+            if not was_tracing:
+                tracemalloc.stop()
+
+    allocation_sites = {}
+    for difference in fetch_differences + parse_differences + extract_differences:
+        if difference.size_diff <= 0:
+            continue
+        frame = difference.traceback[0]
+        site = allocation_sites.setdefault(f"{frame.filename}:{frame.lineno}", {"blocks": 0, "bytes": 0})
+        site["blocks"] += max(difference.count_diff, 0)
+        site["bytes"] += difference.size_diff
+    top_allocations = sorted(
+        ({"site": site, **counts} for site, counts in allocation_sites.items()),
+        key=lambda row: row["bytes"],
+        reverse=True,
+    )[:top]
+
+    stages = {"fetch": fetch_stats, "parse": parse_stats, "extract": extract_stats}
+    return {
+        "url": url,
+        "page_size_bytes": len(html.encode('utf-8')),
+        "dom_nodes": dom_nodes,
+        "total_wall_time": sum(stage["wall_time"] for stage in stages.values()),
+        "stages": stages,
+        "hot_functions": _hot_functions(profiler, top),
+        "top_allocations": top_allocations,
+        "result": {
+            "title": result["title"],
+            "word_count": result["word_count"],
+            "content_hash": result["content_hash"],
+        },
+        "notes": [
+            "Wall times are measured with profiling enabled.",
+            "Allocation figures are process-wide and include allocations made by other threads "
+            "(concurrent requests and job workers) while the stage ran.",
+        ],
+    }
+
+
+def format_report(report):
+    """
+    Format a profiling report as text suitable for a bug report.
+
+    Args:
+        report (dict): Result of `profile_url`
+
+    Returns:
+        str: The formatted report
+    """
+    lines = [
+        f"URL:        {report['url']}",
+        f"Page size:  {report['page_size_bytes']} bytes",
+        f"DOM nodes:  {report['dom_nodes']}",
+        f"Words:      {report['result']['word_count']}",
+        f"Total time: {report['total_wall_time'] * 1000:.1f} ms",
+        "",
+        f"{'stage':<10}{'wall time':>12}{'alloc blocks':>15}{'alloc bytes':>14}{'peak bytes':>14}",
+    ]
+    for name, stage in report["stages"].items():
+        lines.append(
+            f"{name:<10}{stage['wall_time'] * 1000:>9.1f} ms{stage['allocated_blocks']:>15}"
+            f"{stage['allocated_bytes']:>14}{stage['peak_bytes']:>14}"
+        )
+    lines += ["", f"{'own time':>10}{'cumulative':>12}{'calls':>10}  function"]
+    for row in report["hot_functions"]:
+        lines.append(
+            f"{row['own_time'] * 1000:>7.1f} ms{row['cumulative_time'] * 1000:>9.1f} ms{row['calls']:>10}  {row['function']}"
+        )
+    lines += ["", f"{'bytes':>12}{'blocks':>10}  allocation site"]
+    for row in report["top_allocations"]:
+        lines.append(f"{row['bytes']:>12}{row['blocks']:>10}  {row['site']}")
+    lines += [""] + [f"Note: {note}" for note in report["notes"]]
+    return "\n".join(lines)
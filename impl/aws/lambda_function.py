@@ -7,10 +7,12 @@ import logging
 import traceback
 import sys
 import os
+import time
+import requests
 
 # Add parent directory to path to import core package
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
-from core.extractor import ContentExtractor
+from core.extractor import ContentExtractor, parse_deadline_ms
 
 # Configure logging
 logger = logging.getLogger()
@@ -19,6 +21,9 @@ logger.setLevel(logging.INFO)
 # Initialize extractor outside the handler to reuse it across invocations
 extractor = ContentExtractor()
 
+# Time kept from the Lambda remaining time to build and return the response
+DEADLINE_MARGIN_MS = 500
+
 def lambda_handler(event, context):
     """
     AWS Lambda handler function.
@@ -49,6 +54,11 @@ def lambda_handler(event, context):
             'body': ''
         }
     
+    # The deadline is the Lambda remaining time, possibly shortened by the deadline_ms parameter
+    budgets = []
+    if context is not None:
+        budgets.append(context.get_remaining_time_in_millis() - DEADLINE_MARGIN_MS)
+    
     try:
         # Extract the link parameter
         if 'queryStringParameters' in event and event['queryStringParameters'] and 'link' in event['queryStringParameters']:
@@ -61,8 +71,21 @@ def lambda_handler(event, context):
                 'body': json.dumps({"error": "Missing 'link' query parameter"})
             }
         
+        try:
+            deadline_ms = parse_deadline_ms(event['queryStringParameters'].get('deadline_ms'))
+        except ValueError as e:
+            logger.error(str(e))
+            return {
+                'statusCode': 400,
+                'headers': headers,
+                'body': json.dumps({"error": str(e)})
+            }
+        if deadline_ms is not None:
+            budgets.append(deadline_ms)
+        
         # Extract content from the URL
-        result = extractor.extract_from_url(link)
+        deadline = time.monotonic() + max(min(budgets), 0) / 1000 if budgets else None
+        result = extractor.extract_from_url(link, deadline=deadline)
         
         # Return successful response
         return {
@@ -79,6 +102,14 @@ def lambda_handler(event, context):
             'body': json.dumps({"error": str(e)})
         }
     
+    except requests.exceptions.Timeout as e:
+        logger.error(f"Timeout: {str(e)}")
+        return {
+            'statusCode': 504,
+            'headers': headers,
+            'body': json.dumps({"error": f"Timed out fetching content: {str(e)}"})
+        }
+    
     except Exception as e:
         logger.error(f"Error: {str(e)}")
         logger.error(traceback.format_exc())
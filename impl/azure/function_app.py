@@ -7,11 +7,13 @@ import traceback
 import sys
 import os
 import json
+import time
+import requests
 import azure.functions as func
 
 # Add parent directory to path to import core package
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
-from core.extractor import ContentExtractor
+from core.extractor import ContentExtractor, parse_deadline_ms
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, 
@@ -56,9 +58,21 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
             headers=headers
         )
     
+    # Optional latency budget in milliseconds
     try:
+        deadline_ms = parse_deadline_ms(req.params.get('deadline_ms'))
+    except ValueError as e:
+        return func.HttpResponse(
+            json.dumps({"error": str(e)}),
+            status_code=400,
+            headers=headers
+        )
+    
+    try:
+        deadline = time.monotonic() + deadline_ms / 1000 if deadline_ms else None
+        
         # Extract content from the URL
-        result = extractor.extract_from_url(link)
+        result = extractor.extract_from_url(link, deadline=deadline)
         
         # Return successful response
         return func.HttpResponse(
@@ -75,6 +89,14 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
             headers=headers
         )
     
+    except requests.exceptions.Timeout as e:
+        logger.error(f"Timeout: {str(e)}")
+        return func.HttpResponse(
+            json.dumps({"error": f"Timed out fetching content: {str(e)}"}),
+            status_code=504,
+            headers=headers
+        )
+    
     except Exception as e:
         logger.error(f"Error: {str(e)}")
         logger.error(traceback.format_exc())
@@ -8,10 +8,12 @@ from flask import jsonify, Request
 import functions_framework
 import sys
 import os
+import time
+import requests
 
 # Add parent directory to path to import core package
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
-from core.extractor import ContentExtractor
+from core.extractor import ContentExtractor, parse_deadline_ms
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, 
@@ -54,12 +56,22 @@ def extract_content(request: Request):
     if not link:
         return (jsonify({'error': 'Missing "link" query parameter'}), 400, headers)
     
+    # Optional latency budget in milliseconds
     try:
+        deadline_ms = parse_deadline_ms(request.args.get('deadline_ms'))
+    except ValueError as e:
+        return (jsonify({'error': str(e)}), 400, headers)
+    
+    try:
+        deadline = time.monotonic() + deadline_ms / 1000 if deadline_ms else None
+        
         # Extract content from the URL
-        result = extractor.extract_from_url(link)
+        result = extractor.extract_from_url(link, deadline=deadline)
         return (jsonify(result), 200, headers)
     except ValueError as e:
         return (jsonify({'error': str(e)}), 400, headers)
+    except requests.exceptions.Timeout as e:
+        return (jsonify({'error': f"Timed out fetching content: {str(e)}"}), 504, headers)
     except Exception as e:
         logger.error(f"Error processing URL {link}: {str(e)}")
         logger.error(traceback.format_exc())
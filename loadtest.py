@@ -0,0 +1,392 @@
+#!/usr/bin/env python
+"""
+Load testing script for LLM Content Proxy.
+Starts a local origin simulator and the proxy server, drives the proxy with an
+open-loop arrival rate and reports throughput, latency percentiles, error rates
+and server memory over time. Everything runs on localhost.
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import requests
+
+WORDS = ("lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor "
+         "incididunt ut labore et dolore magna aliqua enim ad minim veniam quis nostrud").split()
+
+def parse_distribution(spec):
+    """
+    Parse a latency distribution specification.
+
+    Supported forms (values in seconds):
+        fixed:D, uniform:MIN,MAX, exp:MEAN, lognormal:MEDIAN,SIGMA
+
+    Args:
+        spec (str): The distribution specification
+
+    Returns:
+        callable: Function returning a random delay in seconds
+    """
+    kind, _, args = spec.partition(':')
+    try:
+        values = [float(v) for v in args.split(',')] if args else []
+        if kind == 'fixed' and len(values) == 1:
+            return lambda: values[0]
+        if kind == 'uniform' and len(values) == 2:
+            return lambda: random.uniform(values[0], values[1])
+        if kind == 'exp' and len(values) == 1:
+            return lambda: random.expovariate(1 / values[0]) if values[0] > 0 else 0.0
+        if kind == 'lognormal' and len(values) == 2:
+            return lambda: random.lognormvariate(math.log(values[0]), values[1])
+    except ValueError:
+        pass
+    raise argparse.ArgumentTypeError(f"Invalid distribution: {spec}")
+
+def parse_size(spec):
+    """
+    Parse a page size specification, either a byte count or a MIN-MAX range.
+
+    Args:
+        spec (str): The size specification
+
+    Returns:
+        callable: Function returning a random page size in bytes
+    """
+    try:
+        if '-' in spec:
+            low, high = (int(v) for v in spec.split('-', 1))
+            return lambda: random.randint(low, high)
+        size = int(spec)
+        return lambda: size
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid size: {spec}")
+
+def build_page(path, size):
+    """Build an HTML article of roughly `size` bytes whose content is unique to `path`."""
+    rng = random.Random(path)
+    head = f"<html><head><title>Page {path}</title></head><body><article>"
+    tail = "</article></body></html>"
+    paragraphs = []
+    length = len(head) + len(tail)
+    while length < size:
+        paragraph = "<p>" + " ".join(rng.choice(WORDS) for _ in range(80)) + "</p>"
+        paragraphs.append(paragraph)
+        length += len(paragraph)
+    return (head + "".join(paragraphs) + tail).encode('utf-8')
+
+class OriginSimulator:
+    """Local HTTP origin serving synthetic articles with configurable latency, errors and slow bodies."""
+
+    def __init__(self, page_size, latency, error_rate=0.0, drip_rate=0.0, drip_chunk=1024, drip_interval=0.5):
+        """
+        Initialize the origin simulator.
+
+        Args:
+            page_size (callable): Returns the size in bytes of the next page
+            latency (callable): Returns the delay in seconds before the response headers
+            error_rate (float, optional): Fraction of requests answered with a 500 error. Defaults to 0.
+            drip_rate (float, optional): Fraction of responses sent as a slow-drip body. Defaults to 0.
+            drip_chunk (int, optional): Bytes sent per slow-drip chunk. Defaults to 1024.
+            drip_interval (float, optional): Seconds between slow-drip chunks. Defaults to 0.5.
+        """
+        self.page_size = page_size
+        self.latency = latency
+        self.error_rate = error_rate
+        self.drip_rate = drip_rate
+        self.drip_chunk = drip_chunk
+        self.drip_interval = drip_interval
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler_class())
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+
+    def _handler_class(self):
+        origin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                time.sleep(max(origin.latency(), 0.0))
+                if random.random() < origin.error_rate:
+                    self.send_error(500, "Simulated origin error")
+                    return
+                body = build_page(self.path, origin.page_size())
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                try:
+                    if random.random() < origin.drip_rate:
+                        for start in range(0, len(body), origin.drip_chunk):
+                            self.wfile.write(body[start:start + origin.drip_chunk])
+                            self.wfile.flush()
+                            time.sleep(origin.drip_interval)
+                    else:
+                        self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        """Serve requests in a background thread."""
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def stop(self):
+        """Stop serving requests."""
+        self.server.shutdown()
+        self.server.server_close()
+
+def free_port():
+    """Find a free TCP port on localhost."""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def start_proxy(port, state_dir):
+    """Start the proxy server in a subprocess and wait until it is healthy."""
+    env = dict(os.environ)
+    env["LLM_CONTENT_PROXY_JOBS_DB"] = str(Path(state_dir) / "jobs.db")
+    env["LLM_CONTENT_PROXY_CRAWL_DB"] = str(Path(state_dir) / "crawl.db")
+    env["LLM_CONTENT_PROXY_CONTENT_DB"] = str(Path(state_dir) / "content.db")
+    process = subprocess.Popen(
+        [sys.executable, "-c", f"from server.app import run_server; run_server(host='127.0.0.1', port={port})"],
+        cwd=Path(__file__).parent.absolute(),
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("Proxy server exited during startup")
+        try:
+            if requests.get(f"http://127.0.0.1:{port}/health", timeout=1).ok:
+                return process
+        except requests.exceptions.RequestException:
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("Proxy server did not become healthy")
+
+def read_rss(pid):
+    """Read the resident set size of a process in bytes, or None if unavailable."""
+    try:
+        with open(f"/proc/{pid}/status", 'r', encoding='utf-8') as file:
+            for line in file:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+def run_load(proxy_url, origin_url, rate, duration, arrivals, max_inflight, client_timeout, pid, sample_interval):
+    """
+    Drive the proxy with an open-loop arrival rate.
+
+    Requests are scheduled independently of the responses, and latency is measured
+    from the scheduled send time so queueing delays are not hidden.
+
+    Returns:
+        dict: Raw samples: a list of (scheduled, latency, outcome) and a list of (time, rss)
+    """
+    samples = []
+    samples_lock = threading.Lock()
+    rss_series = []
+    local = threading.local()
+    stop_sampling = threading.Event()
+
+    def sample_rss(start):
+        while not stop_sampling.is_set():
+            rss_series.append((time.monotonic() - start, read_rss(pid)))
+            stop_sampling.wait(sample_interval)
+
+    def send(index, scheduled):
+        session = getattr(local, 'session', None)
+        if session is None:
+            session = local.session = requests.Session()
+        try:
+            response = session.get(proxy_url, params={"link": f"{origin_url}/page/{index}"}, timeout=client_timeout)
+            outcome = str(response.status_code)
+        except requests.exceptions.Timeout:
+            outcome = "timeout"
+        except requests.exceptions.RequestException:
+            outcome = "connection_error"
+        latency = time.monotonic() - scheduled
+        with samples_lock:
+            samples.append((scheduled, latency, outcome))
+
+    start = time.monotonic()
+    sampler = threading.Thread(target=sample_rss, args=(start,), daemon=True)
+    sampler.start()
+    with ThreadPoolExecutor(max_workers=max_inflight) as executor:
+        next_send = start
+        index = 0
+        while next_send < start + duration:
+            delay = next_send - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            executor.submit(send, index, next_send)
+            index += 1
+            next_send += random.expovariate(rate) if arrivals == 'poisson' else 1 / rate
+    stop_sampling.set()
+    sampler.join()
+    return {"start": start, "samples": samples, "rss": rss_series}
+
+def summarize(raw, duration):
+    """Compute the report from the raw load samples."""
+    start = raw["start"]
+    samples = raw["samples"]
+    latencies = sorted(latency for _, latency, _ in samples)
+    outcomes = Counter(outcome for _, _, outcome in samples)
+    errors = sum(count for outcome, count in outcomes.items() if outcome != "200")
+    elapsed = max((scheduled - start + latency for scheduled, latency, _ in samples), default=duration)
+
+    timeline = []
+    buckets = {}
+    for scheduled, latency, outcome in samples:
+        second = int(scheduled - start + latency)
+        bucket = buckets.setdefault(second, [0, 0])
+        bucket[0] += 1
+        bucket[1] += outcome != "200"
+    rss_by_second = {}
+    for at, rss in raw["rss"]:
+        rss_by_second[int(at)] = rss
+    for second in range(int(elapsed) + 1):
+        completed, failed = buckets.get(second, (0, 0))
+        timeline.append({
+            "second": second,
+            "completed": completed,
+            "errors": failed,
+            "rss_bytes": rss_by_second.get(second),
+        })
+
+    return {
+        "requests": len(samples),
+        "throughput": len(samples) / elapsed if elapsed else 0.0,
+        "error_rate": errors / len(samples) if samples else 0.0,
+        "outcomes": dict(outcomes),
+        "latency": {
+            "p50": percentile(latencies, 0.50),
+            "p99": percentile(latencies, 0.99),
+            "p999": percentile(latencies, 0.999),
+            "max": latencies[-1] if latencies else None,
+        },
+        "timeline": timeline,
+    }
+
+def print_report(report):
+    """Print a human readable report."""
+    def ms(value):
+        return f"{value * 1000:.1f} ms" if value is not None else "n/a"
+
+    def mib(value):
+        return f"{value / (1024 * 1024):.1f} MiB" if value is not None else "n/a"
+
+    print(f"\nRequests:    {report['requests']}")
+    print(f"Throughput:  {report['throughput']:.1f} req/s")
+    print(f"Error rate:  {report['error_rate'] * 100:.2f}%")
+    print(f"Outcomes:    {', '.join(f'{k}={v}' for k, v in sorted(report['outcomes'].items()))}")
+    print(f"Latency:     p50={ms(report['latency']['p50'])} p99={ms(report['latency']['p99'])} "
+          f"p999={ms(report['latency']['p999'])} max={ms(report['latency']['max'])}")
+    print("\n  second  completed  errors  server RSS")
+    for row in report["timeline"]:
+        print(f"  {row['second']:>6}  {row['completed']:>9}  {row['errors']:>6}  {mib(row['rss_bytes']):>10}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test LLM Content Proxy against a local origin simulator")
+    parser.add_argument("--rate", type=float, default=20.0,
+                        help="Arrival rate in requests per second (default: 20)")
+    parser.add_argument("--duration", type=float, default=30.0,
+                        help="Duration of the load in seconds (default: 30)")
+    parser.add_argument("--arrivals", choices=["poisson", "uniform"], default="poisson",
+                        help="Inter-arrival distribution (default: poisson)")
+    parser.add_argument("--max-inflight", type=int, default=512,
+                        help="Maximum number of concurrent client requests (default: 512)")
+    parser.add_argument("--client-timeout", type=float, default=60.0,
+                        help="Client timeout in seconds (default: 60)")
+    parser.add_argument("--page-size", type=parse_size, default=parse_size("50000"),
+                        help="Origin page size in bytes, or MIN-MAX range (default: 50000)")
+    parser.add_argument("--latency", type=parse_distribution, default=parse_distribution("fixed:0.05"),
+                        help="Origin latency distribution: fixed:D, uniform:MIN,MAX, exp:MEAN or "
+                             "lognormal:MEDIAN,SIGMA in seconds (default: fixed:0.05)")
+    parser.add_argument("--error-rate", type=float, default=0.0,
+                        help="Fraction of origin responses that are 500 errors (default: 0)")
+    parser.add_argument("--drip-rate", type=float, default=0.0,
+                        help="Fraction of origin responses sent as slow-drip bodies (default: 0)")
+    parser.add_argument("--drip-chunk", type=int, default=1024,
+                        help="Bytes per slow-drip chunk (default: 1024)")
+    parser.add_argument("--drip-interval", type=float, default=0.5,
+                        help="Seconds between slow-drip chunks (default: 0.5)")
+    parser.add_argument("--sample-interval", type=float, default=1.0,
+                        help="Seconds between server RSS samples (default: 1)")
+    parser.add_argument("--proxy-url",
+                        help="Use an already running proxy instead of starting one (RSS is not reported)")
+    parser.add_argument("--json", action="store_true",
+                        help="Print the report as JSON")
+    args = parser.parse_args()
+
+    origin = OriginSimulator(
+        page_size=args.page_size,
+        latency=args.latency,
+        error_rate=args.error_rate,
+        drip_rate=args.drip_rate,
+        drip_chunk=args.drip_chunk,
+        drip_interval=args.drip_interval,
+    )
+    origin.start()
+    origin_url = f"http://127.0.0.1:{origin.port}"
+    print(f"Origin simulator listening on {origin_url}", file=sys.stderr)
+
+    process = None
+    with tempfile.TemporaryDirectory() as state_dir:
+        try:
+            if args.proxy_url:
+                proxy_url = args.proxy_url.rstrip('/') + '/'
+                pid = None
+            else:
+                port = free_port()
+                process = start_proxy(port, state_dir)
+                proxy_url = f"http://127.0.0.1:{port}/"
+                pid = process.pid
+            print(f"Driving {proxy_url} at {args.rate} req/s for {args.duration}s", file=sys.stderr)
+
+            raw = run_load(
+                proxy_url, origin_url, args.rate, args.duration, args.arrivals,
+                args.max_inflight, args.client_timeout, pid, args.sample_interval,
+            )
+        finally:
+            if process:
+                process.terminate()
+                process.wait()
+            origin.stop()
+
+    report = summarize(raw, args.duration)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+if __name__ == "__main__":
+    main()
@@ -3,16 +3,24 @@ FastAPI server for website content extraction.
 This provides a standalone HTTP server with API endpoints.
 """
 
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, Header, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 import uvicorn
 import logging
-from typing import Optional
+import os
+import secrets
+import time
+import requests
+from typing import List, Optional
 from pydantic import BaseModel, AnyHttpUrl
 import traceback
 
 from core.extractor import ContentExtractor
+from core.jobs import JobManager, JobStore
+from core.crawler import CrawlStore, FeedCrawler
+from core.dedup import ContentStore
+from core.profiler import profile_url
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, 
@@ -36,7 +44,12 @@ app.add_middleware(
 )
 
 # Initialize content extractor
-extractor = ContentExtractor()
+extractor = ContentExtractor(hedge=os.environ.get("LLM_CONTENT_PROXY_HEDGE", "").lower() in ("1", "true", "yes"))
+
+# Content store, job manager and feed crawler, created on startup so that importing the app has no side effects
+content_store = None
+job_manager = None
+crawler = None
 
 class ExtractionResponse(BaseModel):
     """Model for extraction response."""
@@ -44,28 +57,260 @@ class ExtractionResponse(BaseModel):
     content: str
     url: str
     word_count: int
+    content_hash: str
+    simhash: str
+    duplicate_of: Optional[str] = None
+    partial: bool = False
+
+class JobRequest(BaseModel):
+    """Model for job submission request."""
+    urls: List[str]
+    suppress_duplicates: bool = False
+
+class JobSubmissionResponse(BaseModel):
+    """Model for job submission response."""
+    id: str
+    status: str
+    total: int
+
+class JobItem(BaseModel):
+    """Model for the result of a single URL of a job."""
+    position: int
+    url: str
+    status: str
+    result: Optional[ExtractionResponse] = None
+    error: Optional[str] = None
+    duplicate_of: Optional[str] = None
+
+class JobStatusResponse(BaseModel):
+    """Model for job status response."""
+    id: str
+    status: str
+    total: int
+    pending: int
+    done: int
+    failed: int
+    duplicates: int
+    suppress_duplicates: bool
+    created_at: float
+    updated_at: float
+    results: List[JobItem]
+    next_offset: Optional[int] = None
+
+class CrawlError(BaseModel):
+    """Model for an entry that could not be extracted during a crawl."""
+    url: str
+    error: str
+
+class CrawlDuplicate(BaseModel):
+    """Model for an entry suppressed as a duplicate during a crawl."""
+    url: str
+    duplicate_of: str
+
+class CrawlResponse(BaseModel):
+    """Model for crawl response."""
+    feed: str
+    modified: bool
+    entries: int
+    results: List[ExtractionResponse]
+    duplicates: List[CrawlDuplicate]
+    errors: List[CrawlError]
+
+@app.on_event("startup")
+def open_content_store():
+    """Open the content-addressed store of extracted bodies."""
+    global content_store
+    content_store = ContentStore(os.environ.get("LLM_CONTENT_PROXY_CONTENT_DB", "content.db"))
+
+@app.on_event("startup")
+def start_crawler():
+    """Open the crawl state store."""
+    global crawler
+    store = CrawlStore(os.environ.get("LLM_CONTENT_PROXY_CRAWL_DB", "crawl.db"))
+    crawler = FeedCrawler(
+        store,
+        extractor=extractor,
+        max_workers=int(os.environ.get("LLM_CONTENT_PROXY_CRAWL_WORKERS", "8")),
+        content_store=content_store,
+    )
+
+@app.on_event("shutdown")
+def stop_crawler():
+    """Close the crawl state store."""
+    if crawler:
+        crawler.store.close()
+
+@app.on_event("startup")
+def start_job_manager():
+    """Open the job store and resume unfinished jobs."""
+    global job_manager
+    store = JobStore(os.environ.get("LLM_CONTENT_PROXY_JOBS_DB", "jobs.db"), content_store=content_store)
+    job_manager = JobManager(
+        store,
+        extractor=extractor,
+        max_workers=int(os.environ.get("LLM_CONTENT_PROXY_JOB_WORKERS", "8")),
+    )
+    job_manager.start()
+
+@app.on_event("shutdown")
+def stop_job_manager():
+    """Wait for in-flight job items and close the job store."""
+    if job_manager:
+        job_manager.shutdown()
+        job_manager.store.close()
+
+@app.on_event("shutdown")
+def close_content_store():
+    """Close the content-addressed store."""
+    if content_store:
+        content_store.close()
 
 @app.get("/", response_model=ExtractionResponse)
-async def extract_content(link: AnyHttpUrl = Query(..., description="URL of the webpage to extract content from")):
+def extract_content(
+    link: AnyHttpUrl = Query(..., description="URL of the webpage to extract content from"),
+    deadline_ms: Optional[int] = Query(None, ge=1, description="Latency budget of the request in milliseconds"),
+):
     """
     Extract the main content from the provided URL.
     
     Args:
         link: URL of the webpage to extract content from
+        deadline_ms: Latency budget of the request in milliseconds. Content received
+            when it runs out is extracted and flagged as partial.
         
     Returns:
-        JSON object containing the extracted title, content, original URL, and word count.
+        JSON object containing the extracted title, content, original URL, word count,
+        content fingerprints, the URL of an earlier duplicate, if any, and whether the
+        content is partial.
     """
+    deadline = time.monotonic() + deadline_ms / 1000 if deadline_ms else None
     try:
-        result = extractor.extract_from_url(str(link))
+        result = extractor.extract_from_url(str(link), deadline=deadline)
+        # Partial contents are not stored so they do not shadow the complete page
+        result["duplicate_of"] = content_store.put(result) if not result["partial"] else None
         return result
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    except requests.exceptions.Timeout as e:
+        raise HTTPException(status_code=504, detail=f"Timed out fetching content: {str(e)}")
     except Exception as e:
         logger.error(f"Error processing URL {link}: {str(e)}")
         logger.error(traceback.format_exc())
         raise HTTPException(status_code=500, detail=f"Error extracting content: {str(e)}")
 
+@app.get("/crawl", response_model=CrawlResponse)
+def crawl_feed(
+    feed: AnyHttpUrl = Query(..., description="URL of the RSS/Atom feed or sitemap to crawl"),
+    limit: Optional[int] = Query(None, ge=1, description="Maximum number of entries to extract"),
+    suppress_duplicates: bool = Query(False, description="Leave out the content of entries duplicating an earlier extraction"),
+):
+    """
+    Extract the entries of a feed or sitemap that are new or changed since the previous crawl.
+    
+    Args:
+        feed: URL of the RSS/Atom feed or sitemap to crawl
+        limit: Maximum number of entries to extract
+        suppress_duplicates: Leave out the content of entries duplicating an earlier extraction
+        
+    Returns:
+        JSON object containing the number of entries seen, the extracted results, the
+        suppressed duplicates and the errors.
+    """
+    try:
+        return crawler.crawl(str(feed), limit=limit, suppress_duplicates=suppress_duplicates)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error crawling feed {feed}: {str(e)}")
+        logger.error(traceback.format_exc())
+        raise HTTPException(status_code=500, detail=f"Error crawling feed: {str(e)}")
+
+@app.post("/jobs", response_model=JobSubmissionResponse, status_code=202)
+def create_job(request: JobRequest):
+    """
+    Submit a batch of URLs for asynchronous extraction.
+    
+    Args:
+        request: Object containing the list of URLs to extract content from and
+            whether to suppress the results of duplicate contents
+        
+    Returns:
+        JSON object containing the job id, status and number of URLs.
+    """
+    if not request.urls:
+        raise HTTPException(status_code=400, detail="No URLs provided")
+    job_id = job_manager.submit(request.urls, suppress_duplicates=request.suppress_duplicates)
+    return job_manager.store.get_job(job_id)
+
+@app.get("/jobs/{job_id}", response_model=JobStatusResponse)
+def get_job(
+    job_id: str,
+    offset: int = Query(0, ge=0, description="Position of the first result to return"),
+    limit: int = Query(100, ge=1, le=1000, description="Maximum number of results to return"),
+):
+    """
+    Report the progress of a job and page through its results.
+    
+    Args:
+        job_id: Identifier returned when the job was submitted
+        offset: Position of the first result to return
+        limit: Maximum number of results to return
+        
+    Returns:
+        JSON object containing the job progress and a page of results.
+    """
+    job = job_manager.store.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    results = job_manager.store.get_results(job_id, offset=offset, limit=limit)
+    next_offset = offset + limit if offset + limit < job["total"] else None
+    return {**job, "results": results, "next_offset": next_offset}
+
+@app.delete("/jobs/{job_id}", status_code=204)
+def delete_job(job_id: str):
+    """
+    Delete a job and its results.
+    
+    Args:
+        job_id: Identifier returned when the job was submitted
+    """
+    if not job_manager.store.delete_job(job_id):
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+
+@app.get("/debug/profile")
+def debug_profile(
+    link: AnyHttpUrl = Query(..., description="URL of the webpage to profile"),
+    top: int = Query(20, ge=1, le=200, description="Number of hot functions and allocation sites to report"),
+    x_admin_token: Optional[str] = Header(None),
+):
+    """
+    Profile one fetch and extraction of the provided URL.
+    
+    Only available when the LLM_CONTENT_PROXY_ADMIN_TOKEN environment variable is set,
+    and requires its value in the X-Admin-Token header.
+    
+    Args:
+        link: URL of the webpage to profile
+        top: Number of hot functions and allocation sites to report
+        
+    Returns:
+        JSON object containing the page size, DOM node count, per-stage wall time and
+        allocations, the hottest functions and the top allocation sites.
+    """
+    admin_token = os.environ.get("LLM_CONTENT_PROXY_ADMIN_TOKEN")
+    if not admin_token:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not x_admin_token or not secrets.compare_digest(x_admin_token, admin_token):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+    try:
+        return profile_url(str(link), extractor=extractor, top=top)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error profiling URL {link}: {str(e)}")
+        logger.error(traceback.format_exc())
+        raise HTTPException(status_code=500, detail=f"Error profiling extraction: {str(e)}")
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint."""
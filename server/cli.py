@@ -0,0 +1,43 @@
+"""
+Command-line interface for website content extraction.
+Runs the server by default, or profiles the extraction of a single URL.
+"""
+
+import argparse
+import json
+import sys
+
+from core.profiler import format_report, profile_url
+from .app import run_server
+
+def main(argv=None):
+    """Entry point of the llm-content-proxy command."""
+    parser = argparse.ArgumentParser(prog="llm-content-proxy", description="Website content extraction server")
+    subparsers = parser.add_subparsers(dest="command")
+
+    serve_parser = subparsers.add_parser("serve", help="Run the server (default)")
+    serve_parser.add_argument("--host", default="0.0.0.0", help="Host to listen on (default: 0.0.0.0)")
+    serve_parser.add_argument("--port", type=int, default=8000, help="Port to listen on (default: 8000)")
+
+    profile_parser = subparsers.add_parser("profile", help="Profile the fetch and extraction of a URL")
+    profile_parser.add_argument("url", help="URL of the webpage to profile")
+    profile_parser.add_argument("--top", type=int, default=20,
+                                help="Number of hot functions and allocation sites to report (default: 20)")
+    profile_parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "profile":
+        try:
+            report = profile_url(args.url, top=args.top)
+        except Exception as e:
+            print(f"Error profiling {args.url}: {str(e)}", file=sys.stderr)
+            sys.exit(1)
+        print(json.dumps(report, indent=2) if args.json else format_report(report))
+    elif args.command == "serve":
+        run_server(host=args.host, port=args.port)
+    else:
+        run_server()
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
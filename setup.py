@@ -35,7 +35,7 @@ setup(
     },
     entry_points={
         "console_scripts": [
-            "llm-content-proxy=server.app:run_server",
+            "llm-content-proxy=server.cli:main",
         ],
     },
 )
\ No newline at end of file
@@ -0,0 +1,81 @@
+"""
+Shared fixtures for the test suite.
+"""
+
+import os
+import sys
+import threading
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+# Add parent directory to path to import core package
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.extractor import content_hash, simhash
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    """Static file handler that does not log requests."""
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def origin(tmp_path):
+    """
+    Start local HTTP servers, yielding a function that takes a GET handler and returns the server URL.
+
+    The handler is called with the request handler to write the response; without
+    one, the files of the temporary directory are served.
+    """
+    servers = []
+
+    def start(respond=None):
+        class Handler(QuietHandler):
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, directory=str(tmp_path), **kwargs)
+
+            def do_GET(self):
+                if respond is None:
+                    return super().do_GET()
+                try:
+                    respond(self)
+                except (BrokenPipeError, ConnectionResetError):
+                    # The client went away, e.g. at its deadline
+                    pass
+
+        server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_address[1]}"
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def static_site(tmp_path, origin):
+    """Serve files from a temporary directory on localhost, yielding (directory, base URL)."""
+    return tmp_path, origin()
+
+
+@pytest.fixture
+def make_result():
+    """Build an extraction result for a URL and content, as returned by `ContentExtractor.extract_content`."""
+    def make(url, content):
+        return {
+            "title": "Title",
+            "content": content,
+            "url": url,
+            "word_count": len(content.split()),
+            "content_hash": content_hash(content),
+            "simhash": simhash(content),
+            "partial": False,
+        }
+
+    return make
@@ -0,0 +1,46 @@
+"""
+Tests for the standalone server endpoints.
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+
+from server.app import app
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    for name in ("CONTENT", "CRAWL", "JOBS"):
+        monkeypatch.setenv(f"LLM_CONTENT_PROXY_{name}_DB", str(tmp_path / f"{name.lower()}.db"))
+    with TestClient(app) as client:
+        yield client
+
+
+def test_job_results_are_paged_with_next_offset(client):
+    urls = [f"http://127.0.0.1:1/{i}" for i in range(5)]
+    job_id = client.post("/jobs", json={"urls": urls}).json()["id"]
+
+    first = client.get(f"/jobs/{job_id}", params={"limit": 2}).json()
+    assert [r["url"] for r in first["results"]] == urls[:2]
+    assert first["next_offset"] == 2
+    last = client.get(f"/jobs/{job_id}", params={"offset": 4, "limit": 2}).json()
+    assert [r["url"] for r in last["results"]] == urls[4:]
+    assert last["next_offset"] is None
+
+
+def test_unknown_jobs_are_not_found(client):
+    assert client.get("/jobs/unknown").status_code == 404
+    assert client.delete("/jobs/unknown").status_code == 404
+
+
+def test_profile_endpoint_is_hidden_without_an_admin_token(client, monkeypatch):
+    monkeypatch.delenv("LLM_CONTENT_PROXY_ADMIN_TOKEN", raising=False)
+    response = client.get("/debug/profile", params={"link": "http://example.com/"}, headers={"X-Admin-Token": "x"})
+    assert response.status_code == 404
+
+
+def test_profile_endpoint_requires_the_admin_token(client, monkeypatch):
+    monkeypatch.setenv("LLM_CONTENT_PROXY_ADMIN_TOKEN", "secret")
+    params = {"link": "http://example.com/"}
+    assert client.get("/debug/profile", params=params).status_code == 403
+    assert client.get("/debug/profile", params=params, headers={"X-Admin-Token": "wrong"}).status_code == 403
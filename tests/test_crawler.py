@@ -0,0 +1,119 @@
+"""
+Tests for incremental feed crawling.
+"""
+
+import tracemalloc
+
+from core.crawler import CrawlStore, FeedCrawler, parse_feed
+from core.dedup import ContentStore
+
+
+def write_page(directory, name, content=None):
+    (directory / name).write_text(
+        f"<html><head><title>{name}</title></head><body><article><p>{content or f'Content of {name}'}</p></article></body></html>"
+    )
+
+
+def write_feed(directory, base_url, names):
+    items = "".join(
+        f"<item><link>{base_url}/{name}</link><pubDate>Mon, 01 Jan 2024 00:00:00 GMT</pubDate></item>"
+        for name in names
+    )
+    (directory / "feed.xml").write_text(f"<?xml version='1.0'?><rss><channel>{items}</channel></rss>")
+
+
+def sitemap_chunks(entries):
+    yield b"<?xml version='1.0'?><urlset xmlns='http://www.sitemaps.org/schemas/sitemap/0.9'>"
+    for start in range(0, entries, 1000):
+        yield "".join(
+            f"<url><loc>http://example.com/{i}</loc><lastmod>2024-01-01</lastmod></url>"
+            for i in range(start, start + 1000)
+        ).encode()
+    yield b"</urlset>"
+
+
+def peak_parse_memory(entries):
+    tracemalloc.start()
+    try:
+        assert sum(1 for _ in parse_feed(sitemap_chunks(entries))) == entries
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def test_parse_feed_memory_does_not_grow_with_entries():
+    assert peak_parse_memory(100000) < peak_parse_memory(10000) * 1.5
+
+
+def test_entries_cut_by_limit_are_extracted_by_later_crawls(static_site, tmp_path_factory):
+    directory, base_url = static_site
+    names = [f"p{i}.html" for i in range(5)]
+    for name in names:
+        write_page(directory, name)
+    write_feed(directory, base_url, names)
+    crawler = FeedCrawler(CrawlStore(str(tmp_path_factory.mktemp("state") / "crawl.db")))
+
+    extracted = []
+    for _ in range(3):
+        result = crawler.crawl(f"{base_url}/feed.xml", limit=2)
+        assert result["modified"]
+        extracted += [r["url"] for r in result["results"]]
+    assert sorted(extracted) == [f"{base_url}/{name}" for name in names]
+
+    # Everything was extracted, so the feed is now fetched conditionally
+    crawler.crawl(f"{base_url}/feed.xml")
+    assert not crawler.crawl(f"{base_url}/feed.xml")["modified"]
+
+
+def test_failed_entries_are_retried(static_site, tmp_path_factory):
+    directory, base_url = static_site
+    write_page(directory, "p0.html")
+    write_feed(directory, base_url, ["p0.html", "p1.html"])
+    crawler = FeedCrawler(CrawlStore(str(tmp_path_factory.mktemp("state") / "crawl.db")))
+
+    result = crawler.crawl(f"{base_url}/feed.xml")
+    assert [r["url"] for r in result["results"]] == [f"{base_url}/p0.html"]
+    assert [e["url"] for e in result["errors"]] == [f"{base_url}/p1.html"]
+
+    write_page(directory, "p1.html")
+    result = crawler.crawl(f"{base_url}/feed.xml")
+    assert result["modified"]
+    assert [r["url"] for r in result["results"]] == [f"{base_url}/p1.html"]
+
+
+def test_sitemap_index_is_refetched_while_a_child_is_incomplete(static_site, tmp_path_factory):
+    directory, base_url = static_site
+    write_page(directory, "p0.html")
+    (directory / "index.xml").write_text(
+        "<?xml version='1.0'?><sitemapindex xmlns='http://www.sitemaps.org/schemas/sitemap/0.9'>"
+        f"<sitemap><loc>{base_url}/sitemap.xml</loc></sitemap></sitemapindex>"
+    )
+    (directory / "sitemap.xml").write_text(
+        "<?xml version='1.0'?><urlset xmlns='http://www.sitemaps.org/schemas/sitemap/0.9'>"
+        f"<url><loc>{base_url}/p0.html</loc></url><url><loc>{base_url}/p1.html</loc></url></urlset>"
+    )
+    crawler = FeedCrawler(CrawlStore(str(tmp_path_factory.mktemp("state") / "crawl.db")))
+
+    assert len(crawler.crawl(f"{base_url}/index.xml")["errors"]) == 1
+
+    write_page(directory, "p1.html")
+    result = crawler.crawl(f"{base_url}/index.xml")
+    assert [r["url"] for r in result["results"]] == [f"{base_url}/p1.html"]
+    assert not crawler.crawl(f"{base_url}/index.xml")["modified"]
+
+
+def test_duplicate_entries_are_suppressed(static_site, tmp_path_factory):
+    directory, base_url = static_site
+    for name in ("p0.html", "p1.html"):
+        write_page(directory, name, "The same syndicated article on two pages")
+    write_page(directory, "p2.html")
+    write_feed(directory, base_url, ["p0.html", "p1.html", "p2.html"])
+    state = tmp_path_factory.mktemp("state")
+    crawler = FeedCrawler(CrawlStore(str(state / "crawl.db")), content_store=ContentStore(str(state / "content.db")))
+
+    result = crawler.crawl(f"{base_url}/feed.xml", suppress_duplicates=True)
+    copies = {f"{base_url}/p0.html", f"{base_url}/p1.html"}
+    assert len(result["duplicates"]) == 1
+    duplicate = result["duplicates"][0]
+    assert {duplicate["url"], duplicate["duplicate_of"]} == copies
+    assert sorted(r["url"] for r in result["results"]) == sorted({f"{base_url}/p2.html", duplicate["duplicate_of"]})
@@ -0,0 +1,81 @@
+"""
+Tests for the content-addressed store and near-duplicate detection.
+"""
+
+import random
+
+import pytest
+
+from core.dedup import BANDS, DEFAULT_MAX_DISTANCE, ContentStore, _bands
+from core.extractor import SIMHASH_BITS
+
+ARTICLE = " ".join(f"word{i}" for i in range(500))
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ContentStore(str(tmp_path / "content.db"))
+    yield store
+    store.close()
+
+
+def test_signatures_within_max_distance_share_a_band():
+    rng = random.Random(0)
+    for _ in range(2000):
+        value = rng.getrandbits(SIMHASH_BITS)
+        flipped = value
+        for bit in rng.sample(range(SIMHASH_BITS), rng.randint(0, DEFAULT_MAX_DISTANCE)):
+            flipped ^= 1 << bit
+        bands = _bands(f"{value:016x}")
+        other = _bands(f"{flipped:016x}")
+        assert any(bands[band] == other[band] for band in range(BANDS))
+
+
+def test_identical_content_is_a_duplicate_of_the_first_url(store, make_result):
+    assert store.put(make_result("http://a.example/", ARTICLE)) is None
+    assert store.put(make_result("http://b.example/", ARTICLE)) == "http://a.example/"
+    assert store.put(make_result("http://c.example/", ARTICLE)) == "http://a.example/"
+    # Identical bodies are stored once
+    assert store._conn.execute("SELECT COUNT(*) FROM contents").fetchone()[0] == 1
+
+
+def test_near_identical_content_is_a_duplicate(store, make_result):
+    store.put(make_result("http://a.example/", ARTICLE))
+    assert store.put(make_result("http://b.example/", ARTICLE + " Share this article")) == "http://a.example/"
+    different = " ".join(f"other{i}" for i in range(500))
+    assert store.put(make_result("http://c.example/", different)) is None
+
+
+def test_original_stored_again_is_not_a_duplicate_of_later_copies(store, make_result):
+    store.put(make_result("http://a.example/", ARTICLE))
+    store.put(make_result("http://b.example/", ARTICLE))
+    assert store.put(make_result("http://a.example/", ARTICLE)) is None
+    assert store.put(make_result("http://b.example/", ARTICLE)) == "http://a.example/"
+
+
+def test_empty_content_is_never_a_duplicate(store, make_result):
+    store.put(make_result("http://a.example/", ""))
+    assert store.put(make_result("http://b.example/", "")) is None
+
+
+def test_previous_body_is_deleted_once_unreferenced(store, make_result):
+    first = make_result("http://a.example/", "first version")
+    store.put(first)
+    store.put(make_result("http://b.example/", "first version"))
+    store.put(make_result("http://a.example/", "second version"))
+    # Still referenced by the other URL
+    assert store.get_contents([first["content_hash"]]) == {first["content_hash"]: "first version"}
+
+    store.put(make_result("http://b.example/", "third version"))
+    assert store.get_contents([first["content_hash"]]) == {}
+
+
+def test_retained_body_is_kept_until_released(store, make_result):
+    first = make_result("http://a.example/", "first version")
+    store.put(first)
+    store.retain(first["content_hash"])
+    store.put(make_result("http://a.example/", "second version"))
+    assert first["content_hash"] in store.get_contents([first["content_hash"]])
+
+    store.release(first["content_hash"])
+    assert store.get_contents([first["content_hash"]]) == {}
@@ -0,0 +1,193 @@
+"""
+Tests for content fingerprints, deadlines and hedging in content extraction.
+"""
+
+import hashlib
+import random
+import re
+import threading
+import time
+from urllib.parse import urlparse
+
+import pytest
+
+from core.extractor import (
+    ContentExtractor,
+    DeadlineExceeded,
+    content_hash,
+    hamming_distance,
+    parse_deadline_ms,
+    simhash,
+)
+
+
+def naive_simhash(text, shingle_size=3):
+    tokens = re.findall(r'\w+', text.lower())
+    shingles = [" ".join(tokens[i:i + shingle_size]) for i in range(max(len(tokens) - shingle_size + 1, 1))]
+    counts = [0] * 64
+    for shingle in shingles:
+        value = int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'big')
+        for bit in range(64):
+            counts[bit] += (value >> bit) & 1
+    return f"{sum(1 << bit for bit in range(64) if counts[bit] * 2 > len(shingles)):016x}"
+
+
+def page(paragraphs):
+    body = "".join("<p>" + f"word{i} " * 20 + "</p>" for i in range(paragraphs))
+    return f"<html><head><title>Page</title></head><body><article>{body}</article></body></html>".encode()
+
+
+def dense_page(rows):
+    body = "".join(
+        f'<div class="row"><span><a href="/item/{i}">item {i}</a></span><p>Text <b>bold</b> <i>{i}</i></p></div>'
+        for i in range(rows)
+    )
+    return f"<html><head><title>Page</title></head><body><main>{body}</main></body></html>".encode()
+
+
+def send_page(handler, body, chunk_size=None, interval=0):
+    """Send an HTML page, optionally a chunk at a time every `interval` seconds."""
+    handler.send_response(200)
+    handler.send_header('Content-Type', 'text/html; charset=utf-8')
+    handler.send_header('Content-Length', str(len(body)))
+    handler.end_headers()
+    chunk_size = chunk_size or len(body)
+    for start in range(0, len(body), chunk_size):
+        handler.wfile.write(body[start:start + chunk_size])
+        handler.wfile.flush()
+        time.sleep(interval)
+
+
+LARGE_PAGE = page(3000)
+DENSE_PAGE = dense_page(6000)
+
+
+def slow_drip(handler):
+    # A 20 KB page, 500 bytes every 0.2 seconds
+    send_page(handler, page(100)[:20000], chunk_size=500, interval=0.2)
+
+
+def slow_headers(handler):
+    time.sleep(2)
+    handler.send_response(200)
+    handler.end_headers()
+
+
+def test_slow_drip_body_returns_partial_content(origin):
+    url = origin(slow_drip)
+    start = time.monotonic()
+    result = ContentExtractor().extract_from_url(url, deadline=time.monotonic() + 1)
+    assert time.monotonic() - start < 1.5
+    assert result["partial"]
+    assert result["word_count"] > 0
+
+
+@pytest.mark.parametrize("budget", [0.5, 1.0])
+def test_large_page_is_cut_to_fit_the_budget(origin, budget):
+    url = origin(lambda handler: send_page(handler, DENSE_PAGE))
+    extractor = ContentExtractor()
+    for _ in range(4):
+        start = time.monotonic()
+        result = extractor.extract_from_url(url, deadline=time.monotonic() + budget)
+        assert time.monotonic() - start <= budget * 1.1
+        assert result["partial"]
+
+
+def test_deadline_before_any_content_raises(origin):
+    url = origin(slow_headers)
+    with pytest.raises(DeadlineExceeded):
+        ContentExtractor().extract_from_url(url, deadline=time.monotonic() + 0.3)
+
+
+def test_no_deadline_extracts_everything(origin):
+    url = origin(lambda handler: send_page(handler, LARGE_PAGE))
+    result = ContentExtractor().extract_from_url(url)
+    assert not result["partial"]
+    assert result["word_count"] == 3000 * 20
+
+
+def test_content_hash_ignores_whitespace():
+    assert content_hash("Some  text\n\nhere ") == content_hash("Some text here")
+    assert content_hash("Some text here") != content_hash("Some other text")
+
+
+@pytest.mark.parametrize("text", ["", "one", "two words", "three words here", "Hello, World! " * 50])
+def test_simhash_matches_naive_bit_counting(text):
+    assert simhash(text) == naive_simhash(text)
+
+
+def test_simhash_matches_naive_bit_counting_on_random_texts():
+    rng = random.Random(0)
+    words = [f"w{i}" for i in range(200)]
+    for length in range(1, 300, 7):
+        text = " ".join(rng.choice(words) for _ in range(length))
+        assert simhash(text) == naive_simhash(text)
+
+
+def test_simhash_of_near_duplicates_differ_by_few_bits():
+    rng = random.Random(1)
+    text = " ".join(f"word{rng.randrange(10000)}" for _ in range(2000))
+    assert hamming_distance(simhash(text), simhash(text + " one more sentence")) <= 3
+    other = " ".join(f"word{rng.randrange(10000)}" for _ in range(2000))
+    assert hamming_distance(simhash(text), simhash(other)) > 3
+
+
+def record_latencies(extractor, url, fast, slow):
+    origin = urlparse(url).netloc
+    for duration in [0.01] * fast + [1.0] * slow:
+        extractor._record_latency(origin, duration)
+    return origin
+
+
+def test_hedge_delay_requires_enough_samples_and_a_heavy_tail():
+    extractor = ContentExtractor(hedge=True)
+    assert extractor._hedge_delay(record_latencies(extractor, "http://few.example/", 10, 0)) is None
+    assert extractor._hedge_delay(record_latencies(extractor, "http://light.example/", 100, 0)) is None
+    assert extractor._hedge_delay(record_latencies(extractor, "http://heavy.example/", 97, 3)) == 0.01
+
+
+def test_slow_fetch_is_hedged(origin):
+    requests_seen = []
+    lock = threading.Lock()
+
+    def first_request_slow(handler):
+        with lock:
+            requests_seen.append(time.monotonic())
+            first = len(requests_seen) == 1
+        if first:
+            time.sleep(2)
+        send_page(handler, page(10))
+
+    url = origin(first_request_slow)
+    extractor = ContentExtractor(hedge=True)
+    record_latencies(extractor, url, 97, 3)
+
+    start = time.monotonic()
+    result = extractor.extract_from_url(url)
+    assert time.monotonic() - start < 1
+    assert len(requests_seen) == 2
+    assert result["word_count"] == 10 * 20
+
+
+def test_fetch_without_tail_is_not_hedged(origin):
+    requests_seen = []
+
+    def respond(handler):
+        requests_seen.append(time.monotonic())
+        time.sleep(0.3)
+        send_page(handler, page(10))
+
+    url = origin(respond)
+    extractor = ContentExtractor(hedge=True)
+    record_latencies(extractor, url, 100, 0)
+    extractor.extract_from_url(url)
+    assert len(requests_seen) == 1
+
+
+def test_parse_deadline_ms():
+    assert parse_deadline_ms(None) is None
+    assert parse_deadline_ms("") is None
+    assert parse_deadline_ms("1500") == 1500
+    for value in ("0", "-5", "1.5", "soon"):
+        with pytest.raises(ValueError, match="deadline_ms"):
+            parse_deadline_ms(value)
@@ -0,0 +1,171 @@
+"""
+Tests for batch job persistence and processing.
+"""
+
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from core.dedup import ContentStore
+from core.jobs import JobManager, JobStore
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "jobs.db")
+
+
+def wait_for_job(store, job_id, timeout=10):
+    end = time.monotonic() + timeout
+    while time.monotonic() < end:
+        job = store.get_job(job_id)
+        if job["status"] == "completed":
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"Job {job_id} did not complete")
+
+
+def write_page(directory, name, content):
+    (directory / name).write_text(
+        f"<html><head><title>{name}</title></head><body><article><p>{content}</p></article></body></html>"
+    )
+
+
+def test_concurrent_stores_never_claim_the_same_item(db_path):
+    job_id = JobStore(db_path).create_job([f"http://example.com/{i}" for i in range(200)])
+    stores = [JobStore(db_path) for _ in range(4)]
+    claimed = [[] for _ in stores]
+
+    def claim(store, into):
+        while True:
+            items = store.claim_items(job_id, 3)
+            if not items:
+                return
+            into.extend(position for position, _ in items)
+
+    threads = [threading.Thread(target=claim, args=(store, into)) for store, into in zip(stores, claimed)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    positions = [position for into in claimed for position in into]
+    assert sorted(positions) == list(range(200))
+
+
+def test_items_are_claimed_again_only_once_their_lease_expired(db_path):
+    job_id = JobStore(db_path).create_job(["http://example.com/a"])
+    assert JobStore(db_path).claim_items(job_id, 10) == [(0, "http://example.com/a")]
+
+    # A restarted process does not take over items another process may still be processing
+    assert JobStore(db_path).claim_items(job_id, 10) == []
+    assert JobStore(db_path).unfinished_jobs() == [job_id]
+    assert JobStore(db_path, lease_timeout=0).claim_items(job_id, 10) == [(0, "http://example.com/a")]
+
+
+def test_job_is_not_completed_while_items_are_unfinished(db_path):
+    store = JobStore(db_path)
+    job_id = store.create_job(["http://example.com/a", "http://example.com/b"])
+    store.claim_items(job_id, 1)
+    assert not store.complete_job(job_id)
+    assert store.get_job(job_id)["status"] != "completed"
+
+    store.fail_item(job_id, 0, "error")
+    store.claim_items(job_id, 1)
+    store.fail_item(job_id, 1, "error")
+    assert store.complete_job(job_id)
+    assert store.get_job(job_id)["status"] == "completed"
+
+
+def test_deleting_a_job_releases_its_bodies(db_path, tmp_path, make_result):
+    content_store = ContentStore(str(tmp_path / "content.db"))
+    store = JobStore(db_path, content_store=content_store)
+    job_id = store.create_job(["http://example.com/a"])
+    store.claim_items(job_id, 1)
+    old = make_result("http://example.com/a", "first version of the page")
+    content_store.put(old)
+    store.complete_item(job_id, 0, old)
+    # Finishing an item twice does not retain its body twice
+    store.complete_item(job_id, 0, old)
+
+    # The job result still references the old body once the page changed
+    content_store.put(make_result("http://example.com/a", "second version of the page"))
+    assert store.get_results(job_id)[0]["result"]["content"] == "first version of the page"
+
+    assert store.delete_job(job_id)
+    assert store.get_job(job_id) is None
+    assert content_store.get_contents([old["content_hash"]]) == {}
+    assert not store.delete_job(job_id)
+
+
+def test_duplicate_items_are_suppressed(static_site, db_path, tmp_path_factory):
+    directory, base_url = static_site
+    write_page(directory, "a.html", "The same syndicated article on two pages")
+    write_page(directory, "b.html", "The same syndicated article on two pages")
+    store = JobStore(db_path, content_store=ContentStore(str(tmp_path_factory.mktemp("content") / "content.db")))
+    manager = JobManager(store, max_workers=1)
+
+    job_id = manager.submit([f"{base_url}/a.html", f"{base_url}/b.html"], suppress_duplicates=True)
+    job = wait_for_job(store, job_id)
+    manager.shutdown()
+    assert (job["done"], job["duplicates"]) == (1, 1)
+    first, second = store.get_results(job_id)
+    assert first["result"]["content"] == "The same syndicated article on two pages"
+    assert (second["status"], second["result"], second["duplicate_of"]) == ("duplicate", None, f"{base_url}/a.html")
+
+
+def test_jobs_interrupted_by_a_crash_are_resumed(static_site, db_path):
+    directory, base_url = static_site
+    write_page(directory, "a.html", "First page")
+    write_page(directory, "b.html", "Second page")
+    crashed = JobStore(db_path)
+    job_id = crashed.create_job([f"{base_url}/a.html", f"{base_url}/b.html"])
+    # The process stopped while extracting the first URL
+    crashed.claim_items(job_id, 1)
+
+    store = JobStore(db_path, lease_timeout=0)
+    manager = JobManager(store)
+    manager.start()
+    job = wait_for_job(store, job_id)
+    manager.shutdown()
+    assert (job["done"], job["pending"], job["failed"]) == (2, 0, 0)
+    assert [r["result"]["content"] for r in store.get_results(job_id)] == ["First page", "Second page"]
+
+
+def test_finished_items_are_left_untouched(db_path, make_result):
+    store = JobStore(db_path)
+    job_id = store.create_job(["http://example.com/a"])
+    store.claim_items(job_id, 1)
+    store.complete_item(job_id, 0, make_result("http://example.com/a", "Content"))
+    store.fail_item(job_id, 0, "late failure")
+    store.suppress_item(job_id, 0, "http://example.com/b")
+
+    [item] = store.get_results(job_id)
+    assert (item["status"], item["error"], item["duplicate_of"]) == ("done", None, None)
+    assert item["result"]["content"] == "Content"
+
+
+def test_items_whose_result_cannot_be_stored_are_failed(static_site, db_path, monkeypatch):
+    directory, base_url = static_site
+    write_page(directory, "a.html", "First page")
+    store = JobStore(db_path)
+
+    def complete_item(*args, **kwargs):
+        raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(store, "complete_item", complete_item)
+    manager = JobManager(store)
+    job_id = manager.submit([f"{base_url}/a.html"])
+    job = wait_for_job(store, job_id)
+    manager.shutdown()
+    assert (job["done"], job["pending"], job["failed"]) == (0, 0, 1)
+    assert store.get_results(job_id)[0]["error"] == "database is locked"
+
+
+def test_results_are_paged_in_submission_order(db_path):
+    store = JobStore(db_path)
+    urls = [f"http://example.com/{i}" for i in range(5)]
+    job_id = store.create_job(urls)
+    assert [r["url"] for r in store.get_results(job_id, offset=0, limit=2)] == urls[:2]
+    assert [r["url"] for r in store.get_results(job_id, offset=4, limit=2)] == urls[4:]
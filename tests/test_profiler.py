@@ -0,0 +1,38 @@
+"""
+Tests for on-demand extraction profiling.
+"""
+
+from core.extractor import ContentExtractor
+from core.profiler import format_report, profile_url
+
+
+def test_profile_report(static_site):
+    directory, base_url = static_site
+    paragraphs = "".join(f"<p>Paragraph {i} of the article</p>" for i in range(50))
+    (directory / "page.html").write_text(
+        f"<html><head><title>Page</title></head><body><article>{paragraphs}</article></body></html>"
+    )
+
+    report = profile_url(f"{base_url}/page.html", extractor=ContentExtractor(hedge=True), top=5)
+    assert set(report) == {
+        "url", "page_size_bytes", "dom_nodes", "total_wall_time", "stages",
+        "hot_functions", "top_allocations", "result", "notes",
+    }
+    assert set(report["stages"]) == {"fetch", "parse", "extract"}
+    for stage in report["stages"].values():
+        assert set(stage) == {"wall_time", "allocated_blocks", "allocated_bytes", "peak_bytes"}
+    assert 0 < len(report["hot_functions"]) <= 5
+    assert len(report["top_allocations"]) <= 5
+    assert report["result"]["word_count"] == 50 * 5
+    assert report["dom_nodes"] > 50
+    assert "Page size" in format_report(report)
+
+
+def test_hedging_extractor_is_profiled_in_the_calling_thread(static_site):
+    directory, base_url = static_site
+    (directory / "page.html").write_text("<html><body><p>Content</p></body></html>")
+
+    report = profile_url(f"{base_url}/page.html", extractor=ContentExtractor(hedge=True), top=1000)
+    # A hedged fetch would run in a download thread, out of sight of the profiler
+    functions = [row["function"] for row in report["hot_functions"]]
+    assert any("requests" in function and function.endswith("(send)") for function in functions)